@@ -1,60 +1,142 @@
 # Streamlit Web App for Bookmark Clustering
 import streamlit as st
 import asyncio
-import json
+import concurrent.futures
+import hashlib
+import io
+import orjson
 import pandas as pd
 from pathlib import Path
 from typing import List, Dict
-import tempfile
-import os
+from dataclasses import dataclass
+import threading
+import uuid
 
 # Import existing modules
-from bookmark_cli.loader import load_chrome_bookmarks, load_chrome_bookmarks_html
-from bookmark_cli.normalizer import normalize_url, deduplicate_entries
+from bookmark_cli.loader import (
+    load_chrome_bookmarks_bytes,
+    load_chrome_bookmarks_html_bytes,
+    flatten_bookmarks,
+)
+from bookmark_cli.normalizer import normalize_url
 from bookmark_cli.fetcher import MetadataFetcher
 from bookmark_cli.llm_client import LLMClient
 from bookmark_cli.categorizer import categorize_bookmarks
 from bookmark_cli.exporter import export_to_chrome_html
-from bookmark_cli.config import settings
+from bookmark_cli.config import get_settings
+
+@dataclass(frozen=True)
+class UploadedBookmarks:
+    """Uploaded file contents identified by a digest computed once on upload"""
+    digest: bytes
+    data: bytes
+    
+    def __hash__(self) -> int:
+        return int.from_bytes(self.digest, 'little')
+
+def to_records(df: pd.DataFrame) -> List[Dict]:
+    """Convert a bookmarks frame back to dicts, dropping fields a row never had"""
+    return [
+        {key: value for key, value in row.items() if not (value is None or value != value)}
+        for row in df.to_dict('records')
+    ]
+
+def llm_payload(bookmark: Dict) -> Dict:
+    """Only the fields the categorization prompt uses; prompt size drives LLM latency"""
+    payload = {
+        'id': bookmark.get('id'),
+        'title': bookmark.get('fetched_title') or bookmark.get('title', ''),
+        'url': bookmark.get('url', ''),
+    }
+    if bookmark.get('description'):
+        payload['description'] = bookmark['description'][:300]
+    if bookmark.get('keywords'):
+        payload['keywords'] = bookmark['keywords']
+    return payload
 
 # Cache decorators for expensive operations
-@st.cache_data
-def load_bookmarks_cached(file_bytes: bytes, is_html: bool) -> List[Dict]:
+@st.cache_data(hash_funcs={UploadedBookmarks: lambda upload: upload.digest})
+def load_bookmarks_cached(upload: UploadedBookmarks, is_html: bool) -> pd.DataFrame:
     """Cache bookmark loading to avoid reprocessing"""
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.html' if is_html else '.json') as tmp_file:
-        tmp_file.write(file_bytes)
-        tmp_path = tmp_file.name
+    if is_html:
+        bookmarks = load_chrome_bookmarks_html_bytes(upload.data)
+    else:
+        bookmarks = flatten_bookmarks(load_chrome_bookmarks_bytes(upload.data))
+    return pd.DataFrame(bookmarks)
+
+@st.cache_resource
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Run one event loop in a background thread for the lifetime of the server"""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="bookmarkai-event-loop", daemon=True).start()
+    return loop
+
+def first_error(error: BaseException) -> BaseException:
+    """The first exception inside (possibly nested) task group errors, for display"""
+    while isinstance(error, BaseExceptionGroup):
+        error = error.exceptions[0]
+    return error
+
+def run_async(coro, on_tick=None, interval: float = 0.25):
+    """Run a coroutine on the shared event loop and wait for its result.
     
+    Streamlit elements can only be updated from the script thread, so
+    `on_tick` is called from here every `interval` seconds while waiting.
+    """
+    future = asyncio.run_coroutine_threadsafe(coro, get_event_loop())
     try:
-        if is_html:
-            bookmarks = load_chrome_bookmarks_html(tmp_path)
-        else:
-            bookmarks = load_chrome_bookmarks(tmp_path)
-        return bookmarks
+        while concurrent.futures.wait([future], timeout=interval).not_done:
+            if on_tick:
+                on_tick()
+        if on_tick:
+            on_tick()
+        return future.result()
     finally:
-        os.unlink(tmp_path)
+        # Don't leave work running on the shared loop if the script is stopped
+        future.cancel()
+
+@st.cache_resource
+def get_fetcher(concurrency_limit: int, timeout: int, respect_robots: bool) -> MetadataFetcher:
+    """Share one fetcher, and its HTTP connection pool, across reruns"""
+    return MetadataFetcher(
+        concurrency_limit=concurrency_limit,
+        timeout=timeout,
+        respect_robots=respect_robots,
+        # Categorize output carries no content_snippet; the LLM payload never used it
+        extract_content=False
+    )
 
 @st.cache_data
-def normalize_and_deduplicate_cached(bookmarks: List[Dict]) -> tuple:
+def normalize_and_deduplicate_cached(bookmarks: pd.DataFrame) -> tuple:
     """Cache cleaning operations"""
-    # Normalize URLs
-    for bookmark in bookmarks:
-        bookmark['url'] = normalize_url(bookmark['url'])
+    # Normalize each distinct URL once; duplicates are exactly what we expect here
+    urls = bookmarks['url']
+    distinct = urls.unique()
+    df = bookmarks.assign(url=urls.map(dict(zip(distinct, map(normalize_url, distinct)))))
+    
+    # Deduplicate on the normalized URL, keeping the oldest bookmark
+    df = df.sort_values('date_added', kind='stable')
+    has_url = df['url'].notna() & (df['url'] != '')
+    duplicated = df.duplicated(subset='url', keep='first') & has_url
     
-    # Deduplicate
-    cleaned, removed = deduplicate_entries(bookmarks)
-    return cleaned, removed
+    return df[~duplicated], df[duplicated]
 
-# Page configuration
-st.set_page_config(
-    page_title="BookmarkAI - Organize Your Bookmarks Intelligently",
-    page_icon="🎯",
-    layout="wide",
-    initial_sidebar_state="collapsed"
-)
+@st.cache_data(max_entries=32)
+def build_chrome_html(run_id: str, _bookmarks: pd.DataFrame) -> bytes:
+    """Cache the Chrome import file per categorization run (the frame itself isn't hashed)"""
+    buffer = io.StringIO()
+    export_to_chrome_html(to_records(_bookmarks), buffer)
+    return buffer.getvalue().encode('utf-8')
 
-# Custom CSS for product-style interface
-st.markdown("""
+@st.cache_data(max_entries=32)
+def build_json_backup(run_id: str, _bookmarks: pd.DataFrame) -> bytes:
+    """Cache the JSON backup per categorization run (the frame itself isn't hashed)"""
+    return orjson.dumps(to_records(_bookmarks), option=orjson.OPT_INDENT_2)
+
+@st.cache_resource
+def custom_css() -> str:
+    """Custom CSS for product-style interface, built once per server process"""
+    return """
     <style>
     .main-header {
         font-size: 3rem;
@@ -89,19 +171,35 @@ st.markdown("""
         margin: 1rem 0;
     }
     </style>
-    """, unsafe_allow_html=True)
+    """
+
+# Page configuration
+st.set_page_config(
+    page_title="BookmarkAI - Organize Your Bookmarks Intelligently",
+    page_icon="🎯",
+    layout="wide",
+    initial_sidebar_state="collapsed"
+)
+
+st.markdown(custom_css(), unsafe_allow_html=True)
 
 # Initialize session state for tracking workflow progress
 if 'bookmarks_raw' not in st.session_state:
     st.session_state.bookmarks_raw = None
 if 'bookmarks_cleaned' not in st.session_state:
     st.session_state.bookmarks_cleaned = None
+if 'bookmarks_removed' not in st.session_state:
+    st.session_state.bookmarks_removed = None
 if 'bookmarks_categorized' not in st.session_state:
     st.session_state.bookmarks_categorized = None
+if 'categorized_run_id' not in st.session_state:
+    st.session_state.categorized_run_id = None
 if 'current_step' not in st.session_state:
     st.session_state.current_step = 1
 if 'uploaded_file_name' not in st.session_state:
     st.session_state.uploaded_file_name = None
+if 'uploaded_file_digest' not in st.session_state:
+    st.session_state.uploaded_file_digest = None
 if 'processing_status' not in st.session_state:
     st.session_state.processing_status = {
         'import': False,
@@ -119,7 +217,7 @@ with st.sidebar:
     st.header("⚙️ Settings")
     
     # Use API key from environment (developer's key)
-    api_key = settings.gemini_api_key
+    api_key = get_settings().gemini_api_key
     
     with st.expander("⚙️ Processing Options", expanded=False):
         # Model selection (hidden from users)
@@ -135,6 +233,15 @@ with st.sidebar:
             help="Larger batches = faster processing"
         )
         
+        # Concurrent LLM requests
+        max_concurrency = st.slider(
+            "Parallel AI Requests",
+            min_value=1,
+            max_value=16,
+            value=8,
+            help="How many batches are categorized at the same time"
+        )
+        
         # Fetch metadata toggle
         fetch_metadata = st.checkbox(
             "Fetch Page Metadata",
@@ -184,38 +291,42 @@ with tab1:
     )
     
     if uploaded_file:
-        with st.spinner("Loading bookmarks..."):
-            try:
-                # Detect file type
-                is_html = (uploaded_file.type == "text/html" or 
-                          uploaded_file.name.endswith('.html') or 
-                          uploaded_file.name.endswith('.htm'))
-                
-                # Save uploaded file temporarily
-                suffix = ".html" if is_html else ".json"
-                with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
-                    tmp_file.write(uploaded_file.getvalue())
-                    tmp_path = tmp_file.name
-                
-                # Load bookmarks using cached function
-                bookmarks = load_bookmarks_cached(uploaded_file.getvalue(), is_html)
-                
-                st.session_state.bookmarks_raw = bookmarks
-                st.session_state.uploaded_file_name = uploaded_file.name
-                st.session_state.current_step = 2
-                st.session_state.processing_status['import'] = True
-                
-                st.success(f"🎉 Successfully loaded **{len(bookmarks):,}** bookmarks from your file!")
-                
-                # Show preview
-                st.subheader("👀 Quick Preview")
-                df = pd.DataFrame(bookmarks[:10])
-                st.dataframe(df[['title', 'url', 'parent']] if 'parent' in df.columns else df[['title', 'url']], use_container_width=True)
-                
-                st.info("➡️ **Next step:** Go to the 'Clean' tab to remove duplicates")
-                
-            except Exception as e:
-                st.error(f"Error loading bookmarks: {str(e)}")
+        try:
+            # Parse only when a different file is uploaded; other reruns reuse the
+            # frame already in session state instead of reloading it from the cache
+            loaded = st.session_state.uploaded_file_digest
+            if loaded is None or loaded[0] != uploaded_file.file_id:
+                with st.spinner("Loading bookmarks..."):
+                    # Detect file type
+                    is_html = (uploaded_file.type == "text/html" or 
+                              uploaded_file.name.endswith('.html') or 
+                              uploaded_file.name.endswith('.htm'))
+                    
+                    # Load bookmarks using cached function, keyed on the content digest.
+                    # getvalue() shares the upload's buffer rather than copying it.
+                    file_bytes = uploaded_file.getvalue()
+                    upload = UploadedBookmarks(
+                        digest=hashlib.blake2b(file_bytes, digest_size=16).digest(),
+                        data=file_bytes
+                    )
+                    st.session_state.bookmarks_raw = load_bookmarks_cached(upload, is_html)
+                    st.session_state.uploaded_file_digest = (uploaded_file.file_id, upload.digest)
+                    st.session_state.uploaded_file_name = uploaded_file.name
+                    st.session_state.current_step = 2
+                    st.session_state.processing_status['import'] = True
+            
+            bookmarks = st.session_state.bookmarks_raw
+            st.success(f"🎉 Successfully loaded **{len(bookmarks):,}** bookmarks from your file!")
+            
+            # Show preview
+            st.subheader("👀 Quick Preview")
+            preview_cols = ['title', 'url', 'parent'] if 'parent' in bookmarks.columns else ['title', 'url']
+            st.dataframe(bookmarks.head(10)[preview_cols], use_container_width=True)
+            
+            st.info("➡️ **Next step:** Go to the 'Clean' tab to remove duplicates")
+            
+        except Exception as e:
+            st.error(f"Error loading bookmarks: {str(e)}")
 
 # Tab 2: Clean
 with tab2:
@@ -236,18 +347,13 @@ with tab2:
             progress_text = st.empty()
             
             try:
-                # Phase 1: Normalize URLs (5%)
-                progress_text.text("Normalizing URLs...")
-                for i, bookmark in enumerate(st.session_state.bookmarks_raw):
-                    bookmark['url'] = normalize_url(bookmark['url'])
-                    progress_bar.progress((i + 1) / len(st.session_state.bookmarks_raw) * 0.05)
-                
-                # Phase 2: Deduplicate (10%)
-                progress_text.text("Removing duplicates...")
-                cleaned, removed = deduplicate_entries(st.session_state.bookmarks_raw)
+                # Normalize URLs and deduplicate (10%)
+                progress_text.text("Normalizing URLs and removing duplicates...")
+                cleaned, removed = normalize_and_deduplicate_cached(st.session_state.bookmarks_raw)
                 progress_bar.progress(0.10)
                 
                 st.session_state.bookmarks_cleaned = cleaned
+                st.session_state.bookmarks_removed = removed
                 st.session_state.current_step = 3
                 
                 progress_bar.progress(1.0)
@@ -262,16 +368,17 @@ with tab2:
                     st.metric("Unique", len(cleaned))
                 
                 st.success(f"✅ **Cleaning complete!** Your bookmarks are now deduplicated and ready to organize.")
-                
-                if removed:
-                    with st.expander(f"🗑️ View {len(removed)} removed duplicates"):
-                        df_removed = pd.DataFrame(removed)
-                        st.dataframe(df_removed[['title', 'url']], use_container_width=True)
-                
                 st.info("➡️ **Next step:** Go to the 'Organize' tab to categorize with AI")
                 
             except Exception as e:
                 st.error(f"Error cleaning bookmarks: {str(e)}")
+        
+        # Only send the removed rows to the browser when asked for
+        removed = st.session_state.bookmarks_removed
+        if removed is not None and not removed.empty:
+            with st.expander(f"🗑️ View {len(removed)} removed duplicates"):
+                if st.checkbox("Show removed duplicates", key="show_removed"):
+                    st.dataframe(removed[['title', 'url']], use_container_width=True)
 
 # Tab 3: Organize
 with tab3:
@@ -292,106 +399,141 @@ with tab3:
                 progress_text = st.empty()
                 
                 try:
-                    bookmarks = st.session_state.bookmarks_cleaned.copy()
+                    # Fetching and categorization work on dicts; convert at the boundary.
+                    # These are fresh dicts, so later stages update them in place.
+                    bookmarks = to_records(st.session_state.bookmarks_cleaned)
                     total_bookmarks = len(bookmarks)
                     
-                    # Phase 1: Fetch metadata with live updates (10% → 40%)
-                    if fetch_metadata:
-                        progress_text.text("Phase 1/2: Fetching metadata from URLs...")
-                        fetcher = MetadataFetcher(
-                            concurrency=10,
-                            timeout=30,
-                            respect_robots=True
-                        )
-                        
-                        # Metadata fetch with live progress tracking
-                        async def fetch_metadata_with_progress(bookmarks, concurrency=10):
-                            completed = 0
-                            
-                            async def track_fetch(bookmark):
-                                nonlocal completed
-                                metadata = await fetcher.fetch_single(bookmark['url'])
-                                bookmark['fetched_title'] = metadata.get('title')
-                                bookmark['description'] = metadata.get('description')
-                                bookmark['keywords'] = metadata.get('keywords')
-                                bookmark['content_snippet'] = metadata.get('content_preview')
-                                
-                                completed += 1
-                                # Progress: 10% to 40% (30% range)
-                                progress = 0.10 + (0.30 * completed / len(bookmarks))
-                                progress_bar.progress(progress)
-                                progress_text.text(f"Phase 1/2: Fetching metadata... {completed}/{len(bookmarks)}")
-                                
-                                return bookmark
-                            
-                            # Process with concurrency limit
-                            tasks = [track_fetch(b) for b in bookmarks]
-                            await asyncio.gather(*tasks)
-                            return bookmarks
-                        
-                        bookmarks = asyncio.run(fetch_metadata_with_progress(bookmarks, concurrency=10))
-                    else:
-                        progress_bar.progress(0.10)
-                    
-                    # Phase 2: LLM categorization with batch logging (40% → 90%)
-                    progress_text.text("Phase 2/2: AI categorization in progress...")
-                    progress_bar.progress(0.40)
+                    # Metadata fetching (10% → 40%) and LLM categorization (40% → 90%) run as one
+                    # pipeline: a batch goes to the LLM as soon as enough bookmarks have metadata
+                    progress_bar.progress(0.10)
+                    progress_text.text("Fetching metadata and categorizing with AI...")
                     
+                    fetcher = get_fetcher(concurrency_limit=10, timeout=30, respect_robots=True)
                     llm_client = LLMClient(api_key=api_key, provider="gemini", model=model)
                     
                     # Calculate batches for progress tracking
                     num_batches = (total_bookmarks + batch_size - 1) // batch_size
                     
-                    # Container for batch results logging
-                    log_container = st.container()
+                    # One table of batch results, redrawn in place as batches finish
+                    log_container = st.empty()
+                    
+                    # Shared pipeline counters (this runs at module scope, so no nonlocal).
+                    # The pipeline only updates these; widgets are redrawn from the script thread.
+                    done = {'fetched': 0, 'batches': 0, 'failed': 0, 'logged': 0, 'shown': None}
+                    batch_logs = []
+                    log_rows = []
+                    
+                    def update_progress():
+                        # Called on every tick; only send widget updates when something moved
+                        if done['shown'] == (done['fetched'], done['batches']):
+                            return
+                        done['shown'] = (done['fetched'], done['batches'])
+                        
+                        progress = 0.10 + (0.30 * done['fetched'] / total_bookmarks) + (0.50 * done['batches'] / num_batches)
+                        progress_bar.progress(min(progress, 0.90))
+                        progress_text.text(
+                            f"Fetched metadata for {done['fetched']}/{total_bookmarks} bookmarks · "
+                            f"categorized batch {done['batches']}/{num_batches}"
+                        )
+                        
+                        # Log new batch results as rows of the batch table
+                        if done['logged'] < len(batch_logs):
+                            for batch_num, batch_results in batch_logs[done['logged']:]:
+                                folders = dict.fromkeys(entry.get('folder', 'Unsorted') for entry in batch_results)
+                                log_rows.append({
+                                    'Batch': f"{batch_num}/{num_batches}",
+                                    'Bookmarks': len(batch_results),
+                                    'Folders': ', '.join(folders),
+                                })
+                            log_container.dataframe(pd.DataFrame(log_rows), hide_index=True, use_container_width=True)
+                            done['logged'] = len(batch_logs)
+                    
+                    async def categorize_batch_with_logging(batch_num, batch):
+                        """Categorize one batch and log its results"""
+                        # Process batch with LLM; results are merged back into the full entries
+                        try:
+                            result = await llm_client.categorize_batch([llm_payload(b) for b in batch])
+                        except Exception:
+                            # Like the CLI, a failed batch keeps its original folders instead of ending the run
+                            done['failed'] += 1
+                            result = [
+                                {"id": b.get("id"), "folder": b.get("parent", "Unsorted"), "tags": [], "confidence": 0.0}
+                                for b in batch
+                            ]
+                        
+                        # Merge results into the original entries
+                        by_id = {e.get("id"): e for e in batch}
+                        batch_results = []
+                        for llm_item in result:
+                            original = by_id.get(llm_item["id"])
+                            if original:
+                                original["folder"] = llm_item.get("folder", "Unsorted")
+                                original["tags"] = llm_item.get("tags", [])
+                                original["confidence"] = llm_item.get("confidence", 0.5)
+                                batch_results.append(original)
+                        
+                        batch_logs.append((batch_num, batch_results))
+                        done['batches'] += 1
+                        return batch_results
+                    
+                    async def categorize_from_queue(queue):
+                        """Categorize bookmarks from the queue in batches of `batch_size`,
+                        with up to `max_concurrency` batches in flight"""
+                        semaphore = asyncio.Semaphore(max_concurrency)
+                        tasks = []
+                        
+                        async def run(batch_num, batch):
+                            async with semaphore:
+                                return await categorize_batch_with_logging(batch_num, batch)
+                        
+                        # The group cancels and awaits the batches still running if anything
+                        # fails; on the shared loop nothing else would clean them up
+                        async with asyncio.TaskGroup() as group:
+                            batch = []
+                            while (bookmark := await queue.get()) is not None:
+                                batch.append(bookmark)
+                                if len(batch) == batch_size:
+                                    tasks.append(group.create_task(run(len(tasks) + 1, batch)))
+                                    batch = []
+                            if batch:
+                                tasks.append(group.create_task(run(len(tasks) + 1, batch)))
+                        
+                        return [entry for task in tasks for entry in task.result()]
                     
-                    async def categorize_with_streamlit(bookmarks, llm_client, batch_size):
-                        """Categorize with live batch logging"""
-                        all_results = []
+                    async def organize(bookmarks):
+                        """Run metadata fetching and categorization concurrently"""
+                        queue = asyncio.Queue()
                         
-                        for batch_idx in range(0, len(bookmarks), batch_size):
-                            batch = bookmarks[batch_idx:batch_idx + batch_size]
-                            batch_num = batch_idx // batch_size + 1
-                            
-                            progress_text.text(f"Phase 2/2: Categorizing batch {batch_num}/{num_batches}...")
-                            
-                            # Process batch with LLM
-                            result = await llm_client.categorize_batch(batch)
-                            
-                            # Merge results with original data
-                            batch_results = []
-                            for llm_item in result:
-                                original = next((e for e in batch if e.get("id") == llm_item["id"]), None)
-                                if original:
-                                    merged = {
-                                        **original,
-                                        "folder": llm_item.get("folder", "Unsorted"),
-                                        "tags": llm_item.get("tags", []),
-                                        "confidence": llm_item.get("confidence", 0.5)
-                                    }
-                                    batch_results.append(merged)
-                                    all_results.append(merged)
-                            
-                            # Log batch results in expandable section
-                            with log_container.expander(f"📦 Batch {batch_num}/{num_batches} - {len(batch_results)} bookmarks"):
-                                for idx, entry in enumerate(batch_results[:5], 1):  # Show first 5
-                                    folder = entry.get('folder', 'Unsorted')
-                                    tags = ', '.join(entry.get('tags', [])[:3])
-                                    title = entry.get('title', 'No title')[:50]
-                                    st.write(f"{idx}. **{title}** → 📁 `{folder}` | 🏷️ {tags}")
-                                
-                                if len(batch_results) > 5:
-                                    st.caption(f"... and {len(batch_results) - 5} more bookmarks")
-                            
-                            # Update progress: 40% to 90% (50% range)
-                            progress = 0.40 + (0.50 * batch_num / num_batches)
-                            progress_bar.progress(progress)
+                        async def produce():
+                            if fetch_metadata:
+                                # Bookmarks are updated in place and handed on as soon as each is
+                                # ready; the progress bar above replaces the fetcher's console one
+                                async for bookmark in fetcher.fetch_metadata_iter(bookmarks, show_progress=False):
+                                    queue.put_nowait(bookmark)
+                                    done['fetched'] += 1
+                            else:
+                                for bookmark in bookmarks:
+                                    queue.put_nowait(bookmark)
+                            queue.put_nowait(None)  # No more bookmarks
                         
-                        return all_results
+                        # Closing the LLM client drops its connection once the run is over. The
+                        # task group makes a failure on either side cancel and await the other
+                        # before the client closes; the shared loop never tears them down itself.
+                        try:
+                            async with llm_client, asyncio.TaskGroup() as group:
+                                group.create_task(produce())
+                                categorized = group.create_task(categorize_from_queue(queue))
+                        except BaseExceptionGroup as errors:
+                            raise first_error(errors)
+                        return categorized.result()
                     
-                    categorized = asyncio.run(categorize_with_streamlit(bookmarks, llm_client, batch_size))
+                    categorized = run_async(organize(bookmarks), on_tick=update_progress)
+                    if done['failed']:
+                        st.warning(f"⚠️ {done['failed']} batch(es) could not be categorized and kept their original folders")
                     
-                    st.session_state.bookmarks_categorized = categorized
+                    st.session_state.bookmarks_categorized = pd.DataFrame(categorized)
+                    st.session_state.categorized_run_id = uuid.uuid4().hex
                     st.session_state.current_step = 4
                     
                     # Complete
@@ -406,16 +548,11 @@ with tab3:
                     st.markdown("### 📊 Organization Summary")
                     st.info("➡️ **Next step:** Go to the 'Download' tab to export your organized bookmarks")
                     
-                    # Calculate folder distribution
-                    folders = {}
-                    tags_counter = {}
-                    for bookmark in categorized:
-                        folder = bookmark.get('folder', 'Unsorted')
-                        folders[folder] = folders.get(folder, 0) + 1
-                        
-                        # Count tags
-                        for tag in bookmark.get('tags', []):
-                            tags_counter[tag] = tags_counter.get(tag, 0) + 1
+                    # Calculate folder and tag distributions
+                    df_categorized = st.session_state.bookmarks_categorized
+                    folders = df_categorized['folder'].fillna('Unsorted').value_counts()
+                    top_tags = df_categorized['tags'].explode().value_counts().head(10)
+                    avg_conf = float(df_categorized['confidence'].fillna(0).mean())
                     
                     # Display metrics in columns
                     col1, col2, col3 = st.columns(3)
@@ -424,13 +561,11 @@ with tab3:
                     with col2:
                         st.metric("Folders Created", len(folders))
                     with col3:
-                        avg_conf = sum(b.get('confidence', 0) for b in categorized) / len(categorized)
                         st.metric("Avg Confidence", f"{avg_conf:.1%}")
                     
                     # Category distribution chart
                     st.subheader("📁 Category Distribution")
-                    df_stats = pd.DataFrame(list(folders.items()), columns=['Folder', 'Count'])
-                    df_stats = df_stats.sort_values('Count', ascending=False)
+                    df_stats = folders.rename_axis('Folder').reset_index(name='Count')
                     st.bar_chart(df_stats.set_index('Folder'))
                     
                     # Detailed stats in expandable sections
@@ -442,8 +577,7 @@ with tab3:
                     
                     with col2:
                         with st.expander("🏷️ Top Tags"):
-                            top_tags = sorted(tags_counter.items(), key=lambda x: x[1], reverse=True)[:10]
-                            df_tags = pd.DataFrame(top_tags, columns=['Tag', 'Count'])
+                            df_tags = top_tags.rename_axis('Tag').reset_index(name='Count')
                             st.dataframe(df_tags, use_container_width=True)
                     
                     # Full statistics JSON
@@ -452,8 +586,8 @@ with tab3:
                             "total_bookmarks": len(categorized),
                             "total_folders": len(folders),
                             "average_confidence": round(avg_conf, 3),
-                            "folders": folders,
-                            "top_tags": dict(top_tags[:10])
+                            "folders": folders.to_dict(),
+                            "top_tags": top_tags.to_dict()
                         }
                         st.json(stats)
                     
@@ -490,55 +624,49 @@ with tab4:
         
         with col1:
             st.markdown("**For Chrome** (Recommended)")
-            if st.button("🌐 Prepare Chrome Import File", type="primary", use_container_width=True):
-                try:
-                    # Generate HTML
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.html', mode='w', encoding='utf-8') as tmp_file:
-                        export_to_chrome_html(st.session_state.bookmarks_categorized, tmp_file.name)
-                        tmp_file.flush()
-                        
-                        # Read the file
-                        with open(tmp_file.name, 'r', encoding='utf-8') as f:
-                            html_content = f.read()
-                        
-                        os.unlink(tmp_file.name)
-                    
-                    st.download_button(
-                        label="⬇️ Download organized_bookmarks.html",
-                        data=html_content,
-                        file_name="organized_bookmarks.html",
-                        mime="text/html",
-                        use_container_width=True
-                    )
-                    
-                    st.success("✅ Ready! Click the download button above")
-                    
-                except Exception as e:
-                    st.error(f"Error preparing file: {str(e)}")
+            try:
+                # Built once per categorization run, then served from cache
+                html_content = build_chrome_html(
+                    st.session_state.categorized_run_id,
+                    st.session_state.bookmarks_categorized
+                )
+                
+                st.download_button(
+                    label="⬇️ Download organized_bookmarks.html",
+                    data=html_content,
+                    file_name="organized_bookmarks.html",
+                    mime="text/html",
+                    type="primary",
+                    use_container_width=True
+                )
+                
+            except Exception as e:
+                st.error(f"Error preparing file: {str(e)}")
         
         with col2:
             st.markdown("**For Backup** (JSON Format)")
-            if st.button("📊 Prepare JSON Backup", use_container_width=True):
-                try:
-                    json_content = json.dumps(st.session_state.bookmarks_categorized, indent=2, ensure_ascii=False)
-                    
-                    st.download_button(
-                        label="⬇️ Download bookmarks.json",
-                        data=json_content,
-                        file_name="bookmarks_organized.json",
-                        mime="application/json",
-                        use_container_width=True
-                    )
-                    
-                    st.success("✅ Ready! Click the download button above")
-                    
-                except Exception as e:
-                    st.error(f"Error preparing backup: {str(e)}")
+            try:
+                json_content = build_json_backup(
+                    st.session_state.categorized_run_id,
+                    st.session_state.bookmarks_categorized
+                )
+                
+                st.download_button(
+                    label="⬇️ Download bookmarks.json",
+                    data=json_content,
+                    file_name="bookmarks_organized.json",
+                    mime="application/json",
+                    use_container_width=True
+                )
+                
+            except Exception as e:
+                st.error(f"Error preparing backup: {str(e)}")
         
         # Preview
         st.markdown("### 👀 Preview Your Organized Bookmarks")
-        if st.session_state.bookmarks_categorized:
-            df = pd.DataFrame(st.session_state.bookmarks_categorized)
+        df = st.session_state.bookmarks_categorized
+        # The full table is re-sent on every rerun, so only render it on request
+        if not df.empty and st.checkbox(f"Show all {len(df):,} organized bookmarks", key="show_preview"):
             columns = ['title', 'folder', 'tags', 'url']
             display_cols = [col for col in columns if col in df.columns]
             st.dataframe(df[display_cols], use_container_width=True, height=400)
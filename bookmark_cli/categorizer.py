@@ -1,82 +1,302 @@
 # bookmark-cli/bookmark_cli/categorizer.py
 import asyncio
-from typing import List, Dict, Any, Tuple
+import hashlib
+import traceback
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
 from collections import defaultdict
 import logging
 
+import aiofiles
+import orjson
+
+from .utils import split_scheme_netloc
+
 logger = logging.getLogger(__name__)
 
+def _payload(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Fields of an entry sent to the LLM"""
+    return {
+        "id": entry.get("id", ""),
+        "title": entry.get("title", ""),
+        "meta": entry.get("meta_description", entry.get("meta", "")),
+        "domain": entry.get("domain", ""),
+        "url": entry.get("url", ""),
+        "last_modified": entry.get("last_modified", ""),
+        "original_folder": entry.get("parent", "")
+    }
+
+def _estimate_tokens(entry: Dict[str, Any]) -> int:
+    """Rough prompt tokens for one entry: ~4 characters per token plus JSON overhead"""
+    meta = entry.get("meta_description") or entry.get("meta") or ""
+    return (len(entry.get("title") or "") + len(meta) + len(entry.get("url") or "")) // 4 + 40
+
+def _pack_batches(
+    entries: List[Dict[str, Any]],
+    batch_size: int,
+    max_tokens: Optional[int] = None
+) -> List[List[Dict[str, Any]]]:
+    """Split entries into batches of at most `batch_size` entries and about `max_tokens` prompt tokens"""
+    if max_tokens is None:
+        return [entries[i:i + batch_size] for i in range(0, len(entries), batch_size)]
+    
+    batches = []
+    current = []
+    tokens = 0
+    for entry in entries:
+        entry_tokens = _estimate_tokens(entry)
+        if current and tokens + entry_tokens > max_tokens:
+            batches.append(current)
+            current = []
+            tokens = 0
+        current.append(entry)
+        tokens += entry_tokens
+        if len(current) == batch_size:
+            batches.append(current)
+            current = []
+            tokens = 0
+    if current:
+        batches.append(current)
+    return batches
+
+def _cache_key(entry: Dict[str, Any]) -> str:
+    """Content hash of an entry for the LLM result cache"""
+    meta = entry.get("meta_description", entry.get("meta", ""))
+    return hashlib.sha256(orjson.dumps([entry.get("url", ""), entry.get("title", ""), meta])).hexdigest()
+
+def _input_digest(entries: List[Dict[str, Any]]) -> str:
+    """Digest of the bookmarks a checkpoint belongs to: their ids and URLs, in order"""
+    return hashlib.sha256(orjson.dumps([[e.get("id", ""), e.get("url", "")] for e in entries])).hexdigest()
+
+def load_progress(progress_path: Path, input_digest: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Load entries checkpointed by `categorize_bookmarks`, one JSON array per completed batch
+    
+    The first line is a header holding the digest of the bookmarks being categorized.
+    With `input_digest`, a checkpoint left by a run over other bookmarks (or one
+    without a header) yields nothing, since ids alone do not identify a bookmark
+    across files.
+    """
+    entries = []
+    with open(progress_path, 'rb') as f:
+        for line_no, line in enumerate(f):
+            try:
+                record = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                # Last batch was cut off mid-write; it will simply be categorized again
+                break
+            if isinstance(record, dict):
+                if input_digest is not None and record.get("input") != input_digest:
+                    return []
+            elif line_no == 0 and input_digest is not None:
+                return []
+            else:
+                entries.extend(record)
+    return entries
+
+def merge_progress(entries: List[Dict[str, Any]], progress_path: Path) -> List[Dict[str, Any]]:
+    """`entries`, each replaced by its categorized version if a checkpoint for them has one"""
+    done = {e.get("id", ""): e for e in load_progress(progress_path, _input_digest(entries))}
+    return [done.get(e.get("id", ""), e) for e in entries]
+
 async def categorize_bookmarks(
     entries: List[Dict[str, Any]],
     llm_client,
-    batch_size: int = 50
+    batch_size: int = 50,
+    max_concurrency: int = 8,
+    progress_path: Optional[Path] = None,
+    fetcher=None,
+    batch_mode: bool = False,
+    max_input_tokens: Optional[int] = None,
+    cache=None
 ) -> List[Dict[str, Any]]:
-    """Categorize bookmarks using LLM in batches"""
+    """Categorize bookmarks using LLM in batches, with up to `max_concurrency` batches in flight
     
-    # Prepare batches
-    batches = []
-    for i in range(0, len(entries), batch_size):
-        batch = entries[i:i + batch_size]
+    If `progress_path` is given, each completed batch is appended to it, and entries
+    already saved there by an interrupted run over the same bookmarks are not sent
+    to the LLM again.
+    If `fetcher` is given, metadata is fetched first and each batch goes to the LLM
+    as soon as enough entries have their metadata.
+    With `batch_mode`, all batches are submitted as one offline batch job instead
+    (cheaper, but the job can take minutes to hours to finish).
+    If `max_input_tokens` is given, a batch is also closed early once its estimated
+    prompt size would exceed it; `batch_size` still caps the entries per batch,
+    since every entry costs output tokens as well.
+    If `cache` (a CacheStorage) is given, entries whose url, title and description
+    were categorized before reuse that result instead of going to the LLM.
+    """
+    
+    # Resume from an earlier, interrupted run
+    checkpointed = []
+    pending = entries
+    if progress_path:
+        digest = _input_digest(entries)
+        if progress_path.exists():
+            checkpointed = load_progress(progress_path, digest)
+        if checkpointed:
+            done_ids = {e.get("id", "") for e in checkpointed}
+            pending = [e for e in entries if e.get("id", "") not in done_ids]
+            logger.info(f"Resuming: {len(checkpointed)} bookmarks already categorized")
+        else:
+            # Start a fresh checkpoint, replacing any left by a run over other bookmarks
+            progress_path.write_bytes(orjson.dumps({"input": digest}) + b"\n")
+    
+    # Reuse results for bookmarks categorized by any earlier run; keys are taken
+    # before metadata fetching so the same input always maps to the same key
+    cache_keys = {}
+    if cache is not None and pending:
+        cache_keys = {e.get("id", ""): _cache_key(e) for e in pending}
+        hits = await asyncio.to_thread(cache.get_llm_responses, set(cache_keys.values()))
+        misses = []
+        cached_entries = []
+        for e in pending:
+            cached = hits.get(cache_keys[e.get("id", "")])
+            if cached is None:
+                misses.append(e)
+            else:
+                cached_entries.append({**e, **cached})
+        logger.info(f"LLM cache: {len(cached_entries)} of {len(pending)} bookmarks already categorized")
+        pending = misses
+        
+        if cached_entries:
+            checkpointed.extend(cached_entries)
+            if progress_path:
+                # Checkpointed like a finished batch, so recovering from a failed run keeps them
+                async with aiofiles.open(progress_path, 'ab') as f:
+                    await f.write(orjson.dumps(cached_entries) + b"\n")
+    
+    # Known up front only when the batches are packed before any is sent
+    num_batches = None
+    semaphore = asyncio.Semaphore(max_concurrency)
+    
+    def _merge(batch_entries: List[Dict[str, Any]], llm_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # Index the batch once so merging is a lookup per LLM result
+        entries_by_id = {e.get("id", ""): e for e in batch_entries}
         
-        # Prepare payload for LLM
-        llm_payload = []
-        for entry in batch:
-            payload_item = {
-                "id": entry.get("id", ""),
-                "title": entry.get("title", ""),
-                "meta": entry.get("meta_description", entry.get("meta", "")),
-                "domain": entry.get("domain", ""),
-                "url": entry.get("url", ""),
-                "last_modified": entry.get("last_modified", ""),
-                "original_folder": entry.get("parent", "")
-            }
-            llm_payload.append(payload_item)
+        # Merge LLM results with original entries
+        categorized_batch = []
+        for llm_item in llm_results:
+            original_entry = entries_by_id.get(llm_item["id"])
+            if original_entry:
+                categorized_batch.append({
+                    **original_entry,
+                    "folder": llm_item.get("folder", "Unsorted"),
+                    "tags": llm_item.get("tags", []),
+                    "confidence": float(llm_item.get("confidence", 0.5))
+                })
+        return categorized_batch
+    
+    async def _checkpoint(categorized_batch: List[Dict[str, Any]], llm_results: List[Dict[str, Any]]) -> None:
+        # Fallbacks for a malformed or failed reply are not model output; like a failed
+        # batch they are neither cached nor checkpointed, so a later run retries them
+        guessed = {item["id"] for item in llm_results if item.get("fallback")}
+        if guessed:
+            categorized_batch = [e for e in categorized_batch if e.get("id", "") not in guessed]
+        if not categorized_batch:
+            return
         
-        batches.append(llm_payload)
+        if cache_keys:
+            await asyncio.to_thread(cache.save_llm_responses, {
+                cache_keys[e.get("id", "")]: {
+                    "folder": e["folder"], "tags": e["tags"], "confidence": e["confidence"]
+                }
+                for e in categorized_batch
+            })
+        if progress_path:
+            # Written off the event loop so other batches and fetches keep running
+            async with aiofiles.open(progress_path, 'ab') as f:
+                await f.write(orjson.dumps(categorized_batch) + b"\n")
     
-    # Process batches
-    categorized_entries = []
-    for batch_idx, batch in enumerate(batches):
-        logger.info(f"Processing batch {batch_idx + 1}/{len(batches)}")
+    async def _run(batch_idx: int, batch_entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        batch = list(map(_payload, batch_entries))
         
-        try:
-            llm_results = await llm_client.categorize_batch(batch)
+        async with semaphore:
+            logger.info(f"Processing batch {batch_idx + 1}" + (f"/{num_batches}" if num_batches else ""))
             
-            # Merge LLM results with original entries
-            for llm_item in llm_results:
-                original_entry = next(
-                    (e for e in entries if e.get("id") == llm_item["id"]),
-                    None
-                )
-                if original_entry:
-                    merged = {
-                        **original_entry,
-                        "folder": llm_item.get("folder", "Unsorted"),
-                        "tags": llm_item.get("tags", []),
-                        "confidence": float(llm_item.get("confidence", 0.5))
-                    }
-                    categorized_entries.append(merged)
-        
-        except Exception as e:
-            import traceback
-            error_details = traceback.format_exc()
-            logger.error(f"Error processing batch {batch_idx}: {type(e).__name__}: {str(e)}")
-            logger.debug(f"Full traceback:\n{error_details}")
-            print(f"[ERROR] Batch {batch_idx} failed: {type(e).__name__}: {str(e)}")
+            try:
+                llm_results = await llm_client.categorize_batch(batch)
+                categorized_batch = _merge(batch_entries, llm_results)
             
-            # Add entries as unsorted if LLM fails
-            for item in batch:
-                original_entry = next(
-                    (e for e in entries if e.get("id") == item["id"]),
-                    None
-                )
-                if original_entry:
-                    categorized_entries.append({
+            except Exception as e:
+                error_details = traceback.format_exc()
+                logger.error(f"Error processing batch {batch_idx}: {type(e).__name__}: {str(e)}")
+                logger.debug(f"Full traceback:\n{error_details}")
+                print(f"[ERROR] Batch {batch_idx} failed: {type(e).__name__}: {str(e)}")
+                
+                # Add entries as unsorted if LLM fails (not checkpointed, so a rerun retries them)
+                return [
+                    {
                         **original_entry,
                         "folder": original_entry.get("parent", "Unsorted"),
                         "tags": [],
                         "confidence": 0.0
-                    })
+                    }
+                    for original_entry in batch_entries
+                ]
+        
+        await _checkpoint(categorized_batch, llm_results)
+        return categorized_batch
+    
+    if batch_mode:
+        # One batch job for everything, so there is nothing to pipeline the fetch into
+        if fetcher is not None:
+            pending = await fetcher.fetch_metadata(pending)
+        batches = _pack_batches(pending, batch_size, max_input_tokens)
+        
+        # Everything was checkpointed or cached; an empty job would only be rejected
+        batch_results = []
+        if batches:
+            logger.info(f"Submitting {len(batches)} batches as one batch job")
+            batch_results = await llm_client.categorize_batches_via_batch_api(
+                [list(map(_payload, batch_entries)) for batch_entries in batches]
+            )
+        
+        results = []
+        for batch_entries, llm_results in zip(batches, batch_results):
+            categorized_batch = _merge(batch_entries, llm_results)
+            await _checkpoint(categorized_batch, llm_results)
+            results.append(categorized_batch)
+    
+    else:
+        if fetcher is None:
+            batches = _pack_batches(pending, batch_size, max_input_tokens)
+            num_batches = len(batches)
+            tasks = [_run(batch_idx, batch_entries) for batch_idx, batch_entries in enumerate(batches)]
+        else:
+            # Pipeline: start each batch as soon as its entries have metadata
+            tasks = []
+            batch_entries = []
+            tokens = 0
+            try:
+                async for entry in fetcher.fetch_metadata_iter(pending):
+                    # Same packing rule as _pack_batches, applied as metadata arrives
+                    entry_tokens = _estimate_tokens(entry) if max_input_tokens else 0
+                    if batch_entries and max_input_tokens and tokens + entry_tokens > max_input_tokens:
+                        tasks.append(asyncio.ensure_future(_run(len(tasks), batch_entries)))
+                        batch_entries = []
+                        tokens = 0
+                    batch_entries.append(entry)
+                    tokens += entry_tokens
+                    if len(batch_entries) == batch_size:
+                        tasks.append(asyncio.ensure_future(_run(len(tasks), batch_entries)))
+                        batch_entries = []
+                        tokens = 0
+                if batch_entries:
+                    tasks.append(asyncio.ensure_future(_run(len(tasks), batch_entries)))
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                raise
+        
+        results = await asyncio.gather(*tasks)
+    
+    categorized_entries = checkpointed
+    for categorized_batch in results:
+        categorized_entries.extend(categorized_batch)
+    
+    # Checkpointed and cached entries come first and batches finish out of order;
+    # hand results back in input order, so a resumed run matches an uninterrupted one
+    order = {e.get("id", ""): i for i, e in enumerate(entries)}
+    categorized_entries.sort(key=lambda e: order.get(e.get("id", ""), len(order)))
     
     # Return categorized entries directly - LLM already assigned folder names
     return categorized_entries
@@ -90,46 +310,41 @@ def build_folders(
     """Organize entries into folders with splitting logic"""
     
     if not use_llm:
-        # Basic folder structure without LLM
+        # Basic folder structure without LLM; keep any folder already assigned
         for entry in entries:
-            entry["folder"] = entry.get("parent", "Unsorted")
+            entry.setdefault("folder", entry.get("parent", "Unsorted"))
         return entries
     
-    # Group by folder name (already assigned by LLM)
+    # Group by folder name (already assigned by LLM); low confidence items go
+    # straight to Unsorted so they never take part in splitting
     groups = defaultdict(list)
+    unsorted_items = []
     for entry in entries:
-        folder = entry.get("folder", "Unsorted")
-        groups[folder].append(entry)
+        if entry.get("confidence", 0) < min_confidence:
+            entry["folder"] = "Unsorted"
+            unsorted_items.append(entry)
+        else:
+            groups[entry.get("folder", "Unsorted")].append(entry)
     
     # Process each group
-    organized_entries = []
+    final_entries = []
     for folder_name, items in groups.items():
         if len(items) <= max_folder_size:
             # Group fits in one folder - keep as is
-            organized_entries.extend(items)
-        else:
-            # Need to split large folders
-            split_groups = _split_large_group(items, max_folder_size)
-            
-            for i, subgroup in enumerate(split_groups):
-                new_folder_name = folder_name
-                if len(split_groups) > 1:
-                    new_folder_name = f"{folder_name} ({i+1})"
-                
-                for item in subgroup:
-                    item["folder"] = new_folder_name
-                organized_entries.extend(subgroup)
-    
-    # Handle low confidence items
-    final_entries = []
-    unsorted_items = []
-    
-    for entry in organized_entries:
-        if entry.get("confidence", 0) < min_confidence:
-            entry["folder"] = "Unsorted"
-            unsorted_items.append(entry)
-        else:
-            final_entries.append(entry)
+            final_entries.extend(items)
+            continue
+        
+        # Need to split large folders
+        split_groups = _split_large_group(items, max_folder_size)
+        if len(split_groups) == 1:
+            final_entries.extend(items)
+            continue
+        
+        for i, subgroup in enumerate(split_groups, 1):
+            new_folder_name = f"{folder_name} ({i})"
+            for item in subgroup:
+                item["folder"] = new_folder_name
+            final_entries.extend(subgroup)
     
     # Add unsorted items
     final_entries.extend(unsorted_items)
@@ -151,33 +366,32 @@ def _split_large_group(
             url = item.get("url", "")
             if url:
                 try:
-                    from urllib.parse import urlparse
-                    domain = urlparse(url).netloc
+                    domain = split_scheme_netloc(url)[1]
                 except:
                     domain = "unknown"
         domain_groups[domain].append(item)
     
     # If domain groups are small enough, use them
     subgroups = []
+    add_subgroup = subgroups.append
     for domain, domain_items in domain_groups.items():
         if len(domain_items) <= max_size:
-            subgroups.append(domain_items)
+            add_subgroup(domain_items)
         else:
             # Still too large, split by tags
             tag_groups = defaultdict(list)
             for item in domain_items:
                 tags = item.get("tags", [])
-                primary_tag = tags[0] if tags else "misc"
-                tag_groups[primary_tag].append(item)
+                tag_groups[tags[0] if tags else "misc"].append(item)
             
             # If tag groups still too large, create numeric shards
             for tag, tag_items in tag_groups.items():
                 if len(tag_items) <= max_size:
-                    subgroups.append(tag_items)
+                    add_subgroup(tag_items)
                 else:
                     # Create numeric shards
-                    for i in range(0, len(tag_items), max_size):
-                        shard = tag_items[i:i + max_size]
-                        subgroups.append(shard)
+                    subgroups.extend(
+                        tag_items[i:i + max_size] for i in range(0, len(tag_items), max_size)
+                    )
     
     return subgroups
\ No newline at end of file
@@ -1,26 +1,38 @@
 # bookmark-cli/bookmark_cli/cli.py
 import typer
 from typing import Optional, List
-import json
+import csv
+import orjson
 import os
 from pathlib import Path
 from rich.console import Console
 from rich.table import Table
-import asyncio
+from collections import Counter
+from datetime import datetime
 
-from .config import settings, init_config
-from .loader import load_chrome_bookmarks, flatten_bookmarks
-from .normalizer import normalize_url, deduplicate_entries
-from .fetcher import MetadataFetcher
-from .llm_client import LLMClient
-from .categorizer import categorize_bookmarks, build_folders
-from .preview import generate_preview, show_preview
-from .exporter import export_to_chrome_format
-from .storage import CacheStorage
+from .utils import split_scheme_netloc
+
+# Modules with heavy dependencies (pydantic-settings, httpx, lxml) are
+# imported inside the commands that use them, so --help and stats start quickly.
 
 app = typer.Typer(help="Organize Chrome bookmarks with LLM assistance")
 console = Console()
 
+def _jload(path: Path):
+    """Read a JSON file"""
+    return orjson.loads(Path(path).read_bytes())
+
+def _jdump(path: Path, obj) -> None:
+    """Write obj to a JSON file with 2-space indentation"""
+    Path(path).write_bytes(orjson.dumps(obj, option=orjson.OPT_INDENT_2))
+
+async def _closing(resource, coro):
+    """Await coro, then close `resource` (an async context manager, or None)"""
+    if resource is None:
+        return await coro
+    async with resource:
+        return await coro
+
 @app.command()
 def init(
     config_dir: Optional[Path] = typer.Option(
@@ -28,6 +40,8 @@ def init(
     )
 ):
     """Initialize configuration"""
+    from .config import init_config
+    
     config_path = init_config(config_dir)
     console.print(f"[green]✓ Configuration initialized at: {config_path}[/green]")
 
@@ -39,6 +53,8 @@ def import_bookmarks(
     )
 ):
     """Import and flatten Chrome bookmarks (supports HTML and JSON)"""
+    from .loader import load_chrome_bookmarks, load_chrome_bookmarks_html, flatten_bookmarks
+    
     if not input_file.exists():
         console.print(f"[red]Error: File not found: {input_file}[/red]")
         raise typer.Exit(1)
@@ -46,7 +62,6 @@ def import_bookmarks(
     try:
         # Detect format based on extension or content
         if input_file.suffix.lower() in ['.html', '.htm']:
-            from .loader import load_chrome_bookmarks_html
             console.print("[blue]Detected HTML format[/blue]")
             bookmarks = load_chrome_bookmarks_html(input_file)
             flattened = bookmarks  # HTML loader already flattens
@@ -55,8 +70,7 @@ def import_bookmarks(
             bookmarks = load_chrome_bookmarks(input_file)
             flattened = flatten_bookmarks(bookmarks)
         
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(flattened, f, indent=2, ensure_ascii=False)
+        _jdump(output_file, flattened)
         
         console.print(f"[green]✓ Imported {len(flattened)} bookmarks to {output_file}[/green]")
         
@@ -83,25 +97,28 @@ def clean(
     )
 ):
     """Normalize URLs and remove duplicates"""
+    from .normalizer import deduplicate_entries
+    
     if not input_file.exists():
         console.print(f"[red]Error: File not found: {input_file}[/red]")
         raise typer.Exit(1)
     
     try:
-        with open(input_file, 'r', encoding='utf-8') as f:
-            entries = json.load(f)
+        entries = _jload(input_file)
         
         deduped_entries, removed_entries = deduplicate_entries(entries)
         
         # Save cleaned bookmarks
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(deduped_entries, f, indent=2, ensure_ascii=False)
+        _jdump(output_file, deduped_entries)
         
         # Save removal log
-        with open(log_file, 'w', encoding='utf-8') as f:
-            f.write("removed_id,removed_url,kept_id,kept_url,date_added_removed,date_added_kept\n")
-            for removed, kept in removed_entries:
-                f.write(f"{removed['id']},{removed['url']},{kept['id']},{kept['url']},{removed['date_added']},{kept['date_added']}\n")
+        with open(log_file, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow(["removed_id", "removed_url", "kept_id", "kept_url", "date_added_removed", "date_added_kept"])
+            writer.writerows(
+                (removed['id'], removed['url'], kept['id'], kept['url'], removed['date_added'], kept['date_added'])
+                for removed, kept in removed_entries
+            )
         
         console.print(f"[green]✓ Cleaned {len(deduped_entries)} bookmarks, removed {len(removed_entries)} duplicates[/green]")
     except Exception as e:
@@ -118,14 +135,28 @@ def categorize(
         None, help="Specific model to use (default: gemini-1.5-flash)"
     ),
     batch_size: int = typer.Option(50, help="Batch size for LLM calls"),
+    max_input_tokens: Optional[int] = typer.Option(
+        None, help="Also close a batch early once its estimated prompt tokens exceed this"
+    ),
+    max_concurrency: int = typer.Option(8, help="Maximum LLM batches in flight"),
+    batch_mode: bool = typer.Option(
+        False, help="Submit all batches as one Gemini batch job (half price, may take hours)"
+    ),
     concurrency: int = typer.Option(10, help="HTTP concurrency for fetching"),
     respect_robots: bool = typer.Option(True, help="Respect robots.txt"),
     skip_fetch: bool = typer.Option(False, help="Skip metadata fetching"),
-    save_progress: bool = typer.Option(True, help="Save progress after each batch")
+    save_progress: bool = typer.Option(True, help="Save progress after each batch"),
+    use_cache: bool = typer.Option(True, help="Reuse LLM results for bookmarks categorized by earlier runs")
 ):
     """Fetch metadata and categorize bookmarks"""
+    import asyncio
     import signal
     import sys
+    from .config import get_settings
+    from .fetcher import MetadataFetcher
+    from .llm_client import LLMClient
+    from .categorizer import categorize_bookmarks, build_folders, merge_progress
+    from .storage import CacheStorage
     
     # Setup graceful shutdown
     shutdown_requested = False
@@ -153,23 +184,28 @@ def categorize(
         raise typer.Exit(1)
     
     output_file = Path("bookmarks_categorized.json")
-    progress_file = Path("bookmarks_categorized.progress.json")
+    progress_file = Path("bookmarks_categorized.progress.jsonl")
+    interrupted = False
     
     try:
-        with open(input_file, 'r', encoding='utf-8') as f:
-            entries = json.load(f)
+        entries = _jload(input_file)
         
         console.print(f"[blue]Total bookmarks to process: {len(entries)}[/blue]")
         
-        # Fetch metadata
+        fetcher = None
         if not skip_fetch:
+            fetcher = MetadataFetcher(
+                concurrency_limit=concurrency,
+                respect_robots=respect_robots,
+                # Categorize output carries no content_snippet; the LLM payload never used it
+                extract_content=False
+            )
+        
+        # Fetch metadata up front only without the LLM; otherwise it is pipelined into categorization
+        if fetcher is not None and not use_llm:
             console.print("[yellow]Fetching metadata...[/yellow]")
             try:
-                fetcher = MetadataFetcher(
-                    concurrency_limit=concurrency,
-                    respect_robots=respect_robots
-                )
-                entries_with_meta = asyncio.run(fetcher.fetch_metadata(entries))
+                entries_with_meta = asyncio.run(_closing(fetcher, fetcher.fetch_metadata(entries)))
                 console.print(f"[green]✓ Metadata fetched[/green]")
             except KeyboardInterrupt:
                 console.print("\n[yellow]Metadata fetching interrupted[/yellow]")
@@ -182,9 +218,13 @@ def categorize(
         
         # Categorize with LLM
         if use_llm and not shutdown_requested:
-            console.print("[yellow]Categorizing with LLM...[/yellow]")
+            if fetcher is not None:
+                console.print("[yellow]Fetching metadata and categorizing with LLM...[/yellow]")
+            else:
+                console.print("[yellow]Categorizing with LLM...[/yellow]")
             
             # Determine model and API key
+            settings = get_settings()
             model = model_name or settings.llm_model
             api_key = settings.gemini_api_key or settings.llm_api_key
             
@@ -196,7 +236,15 @@ def categorize(
             
             console.print(f"[blue]Using Gemini model: {model}[/blue]")
             console.print(f"[dim]Batch size: {batch_size} | Press Ctrl+C to stop gracefully[/dim]")
+            if batch_mode:
+                console.print("[dim]Batch mode: results arrive when the batch job finishes[/dim]")
             
+            # The shutdown handler above only sets a flag, which nothing inside the run
+            # checks; Ctrl+C has to raise KeyboardInterrupt (asyncio.run cancels the run
+            # with it) for the recovery below to happen
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+            
+            cache = CacheStorage() if use_cache else None
             try:
                 llm_client = LLMClient(
                     api_key=api_key,
@@ -204,45 +252,55 @@ def categorize(
                     model=model
                 )
                 
-                categorized = asyncio.run(categorize_bookmarks(
+                categorized = asyncio.run(_closing(llm_client, _closing(fetcher, categorize_bookmarks(
                     entries_with_meta,
                     llm_client,
-                    batch_size=batch_size
-                ))
+                    batch_size=batch_size,
+                    max_concurrency=max_concurrency,
+                    progress_path=progress_file if save_progress else None,
+                    fetcher=fetcher,
+                    batch_mode=batch_mode,
+                    max_input_tokens=max_input_tokens,
+                    cache=cache
+                ))))
                 
             except KeyboardInterrupt:
+                interrupted = True
                 console.print("\n[yellow]⚠ Categorization interrupted by user[/yellow]")
-                # Save whatever we have so far
+                # Save whatever we have so far; bookmarks not reached yet stay uncategorized
                 if progress_file.exists():
-                    with open(progress_file, 'r', encoding='utf-8') as f:
-                        categorized = json.load(f)
-                    console.print(f"[blue]Loaded {len(categorized)} bookmarks from progress file[/blue]")
+                    categorized = merge_progress(entries_with_meta, progress_file)
+                    console.print(f"[blue]Merged categorized bookmarks from {progress_file}[/blue]")
                 else:
                     categorized = entries_with_meta
                     console.print("[yellow]No progress file found, saving uncategorized data[/yellow]")
                     
             except Exception as e:
+                interrupted = True
                 console.print(f"[red]✗ Error during categorization: {e}[/red]")
                 console.print(f"[yellow]Check logs for details. Saving progress...[/yellow]")
-                # Try to load progress
+                # Try to load progress; bookmarks not reached yet stay uncategorized
                 if progress_file.exists():
-                    with open(progress_file, 'r', encoding='utf-8') as f:
-                        categorized = json.load(f)
-                    console.print(f"[blue]Recovered {len(categorized)} bookmarks from progress[/blue]")
+                    categorized = merge_progress(entries_with_meta, progress_file)
+                    console.print(f"[blue]Recovered categorized bookmarks from {progress_file}[/blue]")
                 else:
                     categorized = entries_with_meta
                     console.print("[yellow]Saving with basic categorization[/yellow]")
+            finally:
+                if cache is not None:
+                    cache.close()
         else:
             # Basic categorization without LLM
             console.print("[blue]Using basic categorization (no LLM)[/blue]")
             categorized = build_folders(entries_with_meta, use_llm=False)
         
         # Save categorized bookmarks
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(categorized, f, indent=2, ensure_ascii=False)
+        _jdump(output_file, categorized)
         
-        # Clean up progress file
-        if progress_file.exists():
+        # Clean up progress file; after an interrupted run keep it so the next run resumes
+        if interrupted:
+            console.print(f"[dim]Run 'bookmark-cli categorize' again to resume from {progress_file}[/dim]")
+        elif progress_file.exists():
             progress_file.unlink()
         
         console.print(f"\n[green]✓ Successfully processed {len(categorized)} bookmarks[/green]")
@@ -261,17 +319,18 @@ def categorize(
 @app.command()
 def preview():
     """Show preview of categorized bookmarks"""
+    from .preview import generate_preview, show_preview
+    
     try:
         input_file = Path("bookmarks_categorized.json")
         if not input_file.exists():
             console.print("[red]Error: Categorized bookmarks not found. Run 'categorize' first.[/red]")
             raise typer.Exit(1)
         
-        with open(input_file, 'r', encoding='utf-8') as f:
-            categorized = json.load(f)
+        categorized = _jload(input_file)
         
         preview_data = generate_preview(categorized)
-        confirmed = show_preview(preview_data, console)
+        confirmed = show_preview(preview_data, console, categorized)
         
         if confirmed:
             console.print("[green]✓ Preview confirmed[/green]")
@@ -292,33 +351,29 @@ def export(
     )
 ):
     """Export organized bookmarks to Chrome format (HTML or JSON)"""
+    from .exporter import export_to_chrome_json, export_to_chrome_html
+    
     try:
         input_file = Path("bookmarks_categorized.json")
         if not input_file.exists():
             console.print("[red]Error: Categorized bookmarks not found. Run 'categorize' first.[/red]")
             raise typer.Exit(1)
         
-        with open(input_file, 'r', encoding='utf-8') as f:
-            categorized = json.load(f)
+        categorized = _jload(input_file)
         
         # Detect output format
         if output_file.suffix.lower() in ['.html', '.htm']:
-            from .exporter import export_to_chrome_html
             console.print("[blue]Exporting to HTML format[/blue]")
-            html_content = export_to_chrome_html(categorized)
             with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(html_content)
+                export_to_chrome_html(categorized, f)
         else:
             console.print("[blue]Exporting to JSON format[/blue]")
             # Load original for structure if provided
             original = None
             if original_file and original_file.exists():
-                with open(original_file, 'r', encoding='utf-8') as f:
-                    original = json.load(f)
+                original = _jload(original_file)
             
-            exported = export_to_chrome_format(categorized, original_structure=original)
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(exported, f, indent=2, ensure_ascii=False)
+            output_file.write_bytes(export_to_chrome_json(categorized, original_structure=original))
         
         console.print(f"[green]✓ Exported to {output_file}[/green]")
         console.print(f"[blue]Total bookmarks exported: {len(categorized)}[/blue]")
@@ -339,8 +394,7 @@ def list_items(
             console.print("[red]Error: Categorized bookmarks not found[/red]")
             raise typer.Exit(1)
         
-        with open(input_file, 'r', encoding='utf-8') as f:
-            categorized = json.load(f)
+        categorized = _jload(input_file)
         
         table = Table(title="Bookmarks")
         table.add_column("ID", style="cyan")
@@ -393,54 +447,50 @@ def stats(
         
         console.print(f"[blue]Analyzing: {input_file}[/blue]\n")
         
-        with open(input_file, 'r', encoding='utf-8') as f:
-            bookmarks = json.load(f)
+        bookmarks = _jload(input_file)
         
         # Calculate comprehensive statistics
         total = len(bookmarks)
-        folders = {}
-        tags = {}
-        domains = {}
-        protocols = {}
+        folders = Counter()
+        tags = Counter()
+        domains = Counter()
+        protocols = Counter()
         has_description = 0
         has_keywords = 0
         fetch_errors = 0
         
-        from urllib.parse import urlparse
-        from datetime import datetime
-        
         dates = []
         
         for item in bookmarks:
+            get = item.get
+            
             # Folders
-            folder = item.get('folder', item.get('parent', 'Unsorted'))
-            folders[folder] = folders.get(folder, 0) + 1
+            folders[get('folder', get('parent', 'Unsorted'))] += 1
             
             # Tags
-            for tag in item.get('tags', []):
-                tags[tag] = tags.get(tag, 0) + 1
+            tags.update(get('tags', ()))
             
             # Domains and protocols
-            url = item.get('url', '')
+            url = get('url', '')
             if url:
-                parsed = urlparse(url)
-                domain = parsed.netloc
+                scheme, domain = split_scheme_netloc(url)
                 if domain:
-                    domains[domain] = domains.get(domain, 0) + 1
-                protocols[parsed.scheme] = protocols.get(parsed.scheme, 0) + 1
+                    domains[domain] += 1
+                protocols[scheme] += 1
             
             # Metadata stats
-            if item.get('description'):
+            if get('description'):
                 has_description += 1
-            if item.get('keywords'):
+            if get('keywords'):
                 has_keywords += 1
-            if item.get('fetch_error'):
+            if get('fetch_error'):
                 fetch_errors += 1
             
             # Date tracking
-            if item.get('date_added'):
+            date_added = get('date_added')
+            if date_added:
                 try:
-                    dates.append(int(item['date_added']))
+                    dates.append(int(date_added))
                 except:
                     pass
         
@@ -463,28 +513,27 @@ def stats(
                 console.print(f"  Fetch errors: [red]{fetch_errors}[/red]")
         
         console.print(f"\n[bold]🌐 Protocols:[/bold]")
-        for protocol, count in sorted(protocols.items(), key=lambda x: x[1], reverse=True):
+        for protocol, count in protocols.most_common():
             console.print(f"  {protocol}: {count}")
         
         console.print(f"\n[bold]📁 Top 10 Folders:[/bold]")
-        for folder, count in sorted(folders.items(), key=lambda x: x[1], reverse=True)[:10]:
+        for folder, count in folders.most_common(10):
             percentage = count * 100 / total
             console.print(f"  {folder[:40]:40} : {count:4} ({percentage:.1f}%)")
         
         if tags:
             console.print(f"\n[bold]🏷️  Top 10 Tags:[/bold]")
-            for tag, count in sorted(tags.items(), key=lambda x: x[1], reverse=True)[:10]:
+            for tag, count in tags.most_common(10):
                 console.print(f"  {tag[:40]:40} : {count:4}")
         
         console.print(f"\n[bold]🌍 Top 10 Domains:[/bold]")
-        for domain, count in sorted(domains.items(), key=lambda x: x[1], reverse=True)[:10]:
+        for domain, count in domains.most_common(10):
             console.print(f"  {domain[:40]:40} : {count:4}")
         
         # Date analysis
         if dates:
-            dates_sorted = sorted(dates)
-            oldest = datetime.fromtimestamp(dates_sorted[0] / 1000000)
-            newest = datetime.fromtimestamp(dates_sorted[-1] / 1000000)
+            oldest = datetime.fromtimestamp(min(dates) / 1000000)
+            newest = datetime.fromtimestamp(max(dates) / 1000000)
             console.print(f"\n[bold]📅 Date Range:[/bold]")
             console.print(f"  Oldest bookmark: {oldest.strftime('%Y-%m-%d')}")
             console.print(f"  Newest bookmark: {newest.strftime('%Y-%m-%d')}")
@@ -1,5 +1,6 @@
 # bookmark-cli/bookmark_cli/config.py
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from functools import lru_cache
 from typing import Optional
 from pathlib import Path
 import json
@@ -32,11 +33,12 @@ class Settings(BaseSettings):
     preserve_original_ids: bool = True
     add_metadata_comments: bool = True
     
-    class Config:
-        env_file = ".env"
-        extra = "ignore"
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore", frozen=True)
 
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Load settings once per process"""
+    return Settings()
 
 def init_config(config_dir: Optional[Path] = None) -> Path:
     """Initialize configuration file"""
@@ -1,9 +1,23 @@
 # bookmark-cli/bookmark_cli/exporter.py
-import json
+import io
+import os
+import time
 import uuid
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, TextIO
 from datetime import datetime
 from collections import defaultdict
+from html import escape
+
+import orjson
+
+def _bulk_guids(count: int) -> List[str]:
+    """Draw `count` random (version 4) GUIDs from a single os.urandom call"""
+    raw = os.urandom(16 * count)
+    return [str(uuid.UUID(bytes=raw[i:i + 16], version=4)) for i in range(0, 16 * count, 16)]
+
+def _date_added(entry: Dict[str, Any]) -> str:
+    """Sort key for bookmarks, oldest first; undated ones sort as "0" """
+    return entry.get("date_added", "0")
 
 def export_to_chrome_format(
     entries: List[Dict[str, Any]],
@@ -11,6 +25,19 @@ def export_to_chrome_format(
 ) -> Dict[str, Any]:
     """Export organized bookmarks to Chrome format"""
     
+    # Group entries by folder, oldest first: folders keep their order of first
+    # appearance, and one stable sort up front leaves every folder's items
+    # already in date order
+    folder_entries = {entry.get("folder", "Unsorted"): [] for entry in entries}
+    for entry in sorted(entries, key=_date_added):
+        folder_entries[entry.get("folder", "Unsorted")].append(entry)
+    
+    # One timestamp for the whole export, and every GUID drawn up front:
+    # 3 roots + folders + bookmarks (guid and fallback id) + metadata folder
+    now_us = time.time_ns() // 1000
+    now_us_str = str(now_us)
+    next_guid = iter(_bulk_guids(4 + len(folder_entries) + 2 * len(entries))).__next__
+    
     # Create Chrome bookmarks structure
     chrome_bookmarks = {
         "checksum": "",
@@ -19,7 +46,7 @@ def export_to_chrome_format(
                 "children": [],
                 "date_added": "0",
                 "date_modified": "0",
-                "guid": str(uuid.uuid4()),
+                "guid": next_guid(),
                 "id": "1",
                 "name": "Bookmarks bar",
                 "type": "folder"
@@ -28,7 +55,7 @@ def export_to_chrome_format(
                 "children": [],
                 "date_added": "0",
                 "date_modified": "0",
-                "guid": str(uuid.uuid4()),
+                "guid": next_guid(),
                 "id": "2",
                 "name": "Other bookmarks",
                 "type": "folder"
@@ -37,7 +64,7 @@ def export_to_chrome_format(
                 "children": [],
                 "date_added": "0",
                 "date_modified": "0",
-                "guid": str(uuid.uuid4()),
+                "guid": next_guid(),
                 "id": "3",
                 "name": "Mobile bookmarks",
                 "type": "folder"
@@ -46,38 +73,27 @@ def export_to_chrome_format(
         "version": 1
     }
     
-    # Group entries by folder
-    folder_entries = defaultdict(list)
-    for entry in entries:
-        folder = entry.get("folder", "Unsorted")
-        folder_entries[folder].append(entry)
-    
-    # Create folder nodes
-    folder_nodes = {}
+    # Create folder nodes straight on the bookmark bar
+    bookmark_bar_children = chrome_bookmarks["roots"]["bookmark_bar"]["children"]
+    folder_count = 0
     for folder_name, folder_items in folder_entries.items():
         folder_node = {
             "children": [],
-            "date_added": str(int(datetime.now().timestamp() * 1000000)),
-            "date_modified": str(int(datetime.now().timestamp() * 1000000)),
-            "guid": str(uuid.uuid4()),
-            "id": str(len(folder_nodes) + 1000),  # Start from 1000
+            "date_added": now_us_str,
+            "date_modified": now_us_str,
+            "guid": next_guid(),
+            "id": str(folder_count + 1000),  # Start from 1000
             "name": folder_name,
             "type": "folder"
         }
         
-        # Sort items by date_added (oldest first)
-        sorted_items = sorted(
-            folder_items,
-            key=lambda x: x.get("date_added", "0")
-        )
-        
         # Add bookmark items to folder
-        for item in sorted_items:
+        for item in folder_items:
             bookmark_node = {
                 "date_added": item.get("date_added", "0"),
                 "date_modified": item.get("date_added", "0"),
-                "guid": str(uuid.uuid4()),
-                "id": item.get("id", str(uuid.uuid4())),
+                "guid": next_guid(),
+                "id": item["id"] if "id" in item else next_guid(),
                 "name": item.get("title", "No title")[:100],
                 "type": "url",
                 "url": item.get("url", "")
@@ -89,26 +105,23 @@ def export_to_chrome_format(
             
             folder_node["children"].append(bookmark_node)
         
-        folder_nodes[folder_name] = folder_node
-    
-    # Add folders to bookmark bar
-    for folder_node in folder_nodes.values():
-        chrome_bookmarks["roots"]["bookmark_bar"]["children"].append(folder_node)
+        bookmark_bar_children.append(folder_node)
+        folder_count += 1
     
     # Add organizer metadata
     organizer_metadata = {
         "organizer_version": "1.0",
-        "organized_at": datetime.now().isoformat(),
+        "organized_at": datetime.fromtimestamp(now_us / 1000000).isoformat(),
         "total_bookmarks": len(entries),
-        "folders_created": len(folder_nodes)
+        "folders_created": folder_count
     }
     
     # Add metadata as a special folder or in root
     metadata_node = {
         "children": [],
-        "date_added": str(int(datetime.now().timestamp() * 1000000)),
-        "date_modified": str(int(datetime.now().timestamp() * 1000000)),
-        "guid": str(uuid.uuid4()),
+        "date_added": now_us_str,
+        "date_modified": now_us_str,
+        "guid": next_guid(),
         "id": "9999",
         "name": "Organizer Metadata",
         "type": "folder",
@@ -119,69 +132,80 @@ def export_to_chrome_format(
     
     return chrome_bookmarks
 
-def export_to_chrome_html(entries: List[Dict[str, Any]]) -> str:
-    """Export organized bookmarks to Chrome HTML format"""
-    from collections import defaultdict
-    from html import escape
+def export_to_chrome_json(
+    entries: List[Dict[str, Any]],
+    original_structure: Optional[Dict[str, Any]] = None
+) -> bytes:
+    """Export organized bookmarks to an indented Chrome bookmarks JSON document"""
+    return orjson.dumps(
+        export_to_chrome_format(entries, original_structure=original_structure),
+        option=orjson.OPT_INDENT_2
+    )
+
+_HTML_HEADER = '\n'.join([
+    '<!DOCTYPE NETSCAPE-Bookmark-file-1>',
+    '<!-- This is an automatically generated file.',
+    '     It will be read and overwritten.',
+    '     DO NOT EDIT! -->',
+    '<META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">',
+    '<TITLE>Bookmarks</TITLE>',
+    '<H1>Bookmarks</H1>',
+    '<DL><p>'
+])
+
+def export_to_chrome_html(
+    entries: List[Dict[str, Any]],
+    fileobj: Optional[TextIO] = None
+) -> Optional[str]:
+    """Export organized bookmarks to Chrome HTML format
     
-    # Group entries by folder
+    Returns the HTML, or writes it to `fileobj` (and returns None) when one is given.
+    """
+    # Group entries by folder, oldest first (see export_to_chrome_format)
     folder_entries = defaultdict(list)
-    for entry in entries:
+    for entry in sorted(entries, key=_date_added):
         folder = entry.get("folder", entry.get("parent", "Unsorted"))
         folder_entries[folder].append(entry)
     
-    # Build HTML
-    html_parts = [
-        '<!DOCTYPE NETSCAPE-Bookmark-file-1>',
-        '<!-- This is an automatically generated file.',
-        '     It will be read and overwritten.',
-        '     DO NOT EDIT! -->',
-        '<META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">',
-        '<TITLE>Bookmarks</TITLE>',
-        '<H1>Bookmarks</H1>',
-        '<DL><p>'
-    ]
+    # Stream lines straight into the target instead of collecting them first
+    out = fileobj if fileobj is not None else io.StringIO()
+    write = out.write
+    write(_HTML_HEADER)
+    
+    # One timestamp for the whole export
+    now_s = str(time.time_ns() // 1000000000)
     
     # Add each folder
-    for folder_name in sorted(folder_entries.keys()):
+    for folder_name in sorted(folder_entries):
         items = folder_entries[folder_name]
         
-        # Sort items by date_added (oldest first)
-        sorted_items = sorted(
-            items,
-            key=lambda x: x.get("date_added", "0")
-        )
-        
         # Add folder
-        add_date = int(datetime.now().timestamp())
-        html_parts.append(f'    <DT><H3 ADD_DATE="{add_date}" LAST_MODIFIED="{add_date}">{escape(folder_name)}</H3>')
-        html_parts.append('    <DL><p>')
+        write(f'\n    <DT><H3 ADD_DATE="{now_s}" LAST_MODIFIED="{now_s}">{escape(folder_name)}</H3>\n    <DL><p>')
         
         # Add bookmarks in folder
-        for item in sorted_items:
+        for item in items:
             url = item.get('url', '')
             title = escape(item.get('title', 'No title'))
-            date_added = item.get('date_added', str(int(datetime.now().timestamp())))
             
             # Convert microseconds to seconds if needed
             try:
-                date_int = int(date_added)
-                if date_int > 10000000000:  # Likely microseconds
-                    date_int = date_int // 1000000
-                date_added = str(date_int)
+                date_int = int(item.get('date_added', now_s))
+                date_added = str(date_int // 1000000 if date_int > 10000000000 else date_int)
             except:
-                date_added = str(int(datetime.now().timestamp()))
+                date_added = now_s
             
             # Add tags as part of title if present
             tags = item.get('tags', [])
             if tags:
-                tags_str = ' [' + ', '.join(tags[:3]) + ']'
-                title += tags_str
+                title += ' [' + ', '.join(tags[:3]) + ']'
             
-            html_parts.append(f'        <DT><A HREF="{escape(url)}" ADD_DATE="{date_added}">{title}</A>')
+            write(f'\n        <DT><A HREF="{escape(url)}" ADD_DATE="{date_added}">{title}</A>')
         
-        html_parts.append('    </DL><p>')
+        write('\n    </DL><p>')
+    
+    write('\n</DL><p>')
     
-    html_parts.append('</DL><p>')
+    if fileobj is not None:
+        return None
     
-    return '\n'.join(html_parts)
\ No newline at end of file
+    return out.getvalue()
@@ -1,10 +1,38 @@
 # bookmark-cli/bookmark_cli/fetcher.py
+import re
+from html import unescape
 import httpx
 import asyncio
-from typing import List, Dict, Any, Optional
-from bs4 import BeautifulSoup
+from contextlib import asynccontextmanager
+from typing import List, Dict, Any, Optional, AsyncIterator
+import lxml.html
+from lxml import etree
 from tenacity import retry, stop_after_attempt, wait_exponential
-from rich.progress import Progress, SpinnerColumn, TextColumn
+from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, MofNCompleteColumn
+
+from .normalizer import normalize_url
+from .utils import split_scheme_netloc
+
+_WS_RE = re.compile(r'\s+')
+
+# Head-only fast path: title and meta tags almost always sit in the first 64 KB
+_HEAD_CHARS = 65536
+_META_TAG_RE = re.compile(r'<meta\s[^>]*>', re.IGNORECASE)
+_ATTR_RE = re.compile(r"""([^\s=/>]+)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""")
+_TITLE_RE = re.compile(r'<title[^>]*>(.*?)</title\s*>', re.IGNORECASE | re.DOTALL)
+# Comments and scripts (to their end, or to the end of the scanned text if cut off),
+# whose tag-like text the DOM does not treat as tags
+_HIDDEN_RE = re.compile(r'<!--.*?(?:-->|\Z)|<script\b.*?(?:</script\s*>|\Z)', re.IGNORECASE | re.DOTALL)
+
+def _progress(disable: bool = False) -> Progress:
+    """Progress display for a metadata fetching run"""
+    return Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        BarColumn(),
+        MofNCompleteColumn(),
+        disable=disable,
+    )
 
 class MetadataFetcher:
     """Fetch metadata from URLs"""
@@ -13,12 +41,76 @@ class MetadataFetcher:
         self,
         concurrency_limit: int = 10,
         timeout: int = 10,
-        respect_robots: bool = True
+        respect_robots: bool = True,
+        per_host_limit: int = 4,
+        extract_content: bool = True
     ):
         self.concurrency_limit = concurrency_limit
         self.timeout = timeout
         self.respect_robots = respect_robots
+        self.per_host_limit = per_host_limit
+        # Without a content snippet, most pages need no DOM at all (see _scan_head)
+        self.extract_content = extract_content
         self.semaphore = asyncio.Semaphore(concurrency_limit)
+        # Per-host gates, so one popular host cannot take every global slot; each is
+        # [semaphore, requests holding or waiting for it] and goes once that hits 0
+        self._host_gates: Dict[str, list] = {}
+        # Keep one pooled connection per concurrent fetch alive between requests
+        self._limits = httpx.Limits(
+            max_keepalive_connections=concurrency_limit,
+            max_connections=concurrency_limit * 2,
+            keepalive_expiry=30
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Get the shared HTTP client, creating it on first use"""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            # The client and semaphore are bound to the loop they were created on;
+            # HTTP/2 multiplexes requests to the same host over one connection
+            self._client = httpx.AsyncClient(
+                http2=True,
+                limits=self._limits,
+                timeout=self.timeout,
+                follow_redirects=True
+            )
+            self._client_loop = loop
+            self.semaphore = asyncio.Semaphore(self.concurrency_limit)
+            self._host_gates = {}
+        return self._client
+    
+    @asynccontextmanager
+    async def _host_slot(self, url: str):
+        """Hold one of the `per_host_limit` request slots for the host of `url`"""
+        host = split_scheme_netloc(url)[1].lower()
+        gate = self._host_gates.get(host)
+        if gate is None:
+            gate = self._host_gates[host] = [asyncio.Semaphore(self.per_host_limit), 0]
+        gate[1] += 1
+        try:
+            async with gate[0]:
+                yield
+        finally:
+            # Only hosts with requests in flight or queued keep a gate
+            gate[1] -= 1
+            if gate[1] == 0 and self._host_gates.get(host) is gate:
+                del self._host_gates[host]
+    
+    async def aclose(self) -> None:
+        """Close the shared HTTP client and its pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._client_loop = None
+    
+    async def __aenter__(self) -> "MetadataFetcher":
+        self._get_client()
+        return self
+    
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
         
     @retry(
         stop=stop_after_attempt(3),
@@ -26,92 +118,166 @@ class MetadataFetcher:
     )
     async def fetch_single(
         self,
-        client: httpx.AsyncClient,
-        entry: Dict[str, Any]
+        entry: Dict[str, Any],
+        client: Optional[httpx.AsyncClient] = None,
+        fetches: Optional[Dict[str, asyncio.Future]] = None
     ) -> Dict[str, Any]:
-        """Fetch metadata for a single entry"""
+        """Fetch metadata for a single entry
+        
+        Entries given the same `fetches` dict (one per run) share fetches by
+        normalized URL: duplicates wait on one request instead of repeating it.
+        """
         url = entry.get('url', '')
         
         if not url:
             return entry
         
+        # Already enriched (e.g. by an earlier run)
+        if entry.get('fetched_title') and entry.get('description'):
+            return entry
+        
+        if client is None:
+            client = self._get_client()
+        
+        if fetches is None:
+            fetch = asyncio.ensure_future(self._fetch_url(url, client))
+        else:
+            key = normalize_url(url)
+            fetch = fetches.get(key)
+            if fetch is None:
+                fetch = fetches[key] = asyncio.ensure_future(self._fetch_url(url, client))
+        
         try:
-            async with self.semaphore:
-                response = await client.get(
-                    url,
-                    follow_redirects=True,
-                    timeout=self.timeout
-                )
-                response.raise_for_status()
-                
-                # Parse HTML
-                soup = BeautifulSoup(response.text, 'lxml')
-                
-                # Extract metadata
-                metadata = {
-                    'fetched_title': self._extract_title(soup),
-                    'description': self._extract_description(soup),
-                    'keywords': self._extract_keywords(soup),
-                    'content_snippet': self._extract_content(soup)
-                }
-                
-                # Update entry
-                entry.update(metadata)
-                
+            # Shielded so a cancelled caller does not cancel the fetch other entries share
+            metadata = await asyncio.shield(fetch)
         except Exception as e:
             entry['fetch_error'] = str(e)
+        else:
+            # Update entry
+            entry.update(metadata)
         
         return entry
     
-    def _extract_title(self, soup: BeautifulSoup) -> Optional[str]:
+    async def _fetch_url(self, url: str, client: httpx.AsyncClient) -> Dict[str, Any]:
+        """Fetch a page and extract its metadata"""
+        # Wait for the host first so queued requests to a busy host hold no global slot
+        async with self._host_slot(url), self.semaphore:
+            response = await client.get(
+                url,
+                follow_redirects=True,
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            text = response.text
+            
+            if not self.extract_content:
+                metadata = self._scan_head(text)
+                if metadata is not None:
+                    return metadata
+            
+            # Parse HTML
+            tree = self._parse_html(text)
+            
+            # Extract metadata
+            metadata = {
+                'fetched_title': self._extract_title(tree),
+                'description': self._extract_description(tree),
+                'keywords': self._extract_keywords(tree)
+            }
+            if self.extract_content:
+                metadata['content_snippet'] = self._extract_content(tree)
+            return metadata
+    
+    @staticmethod
+    def _scan_head(text: str) -> Optional[Dict[str, Any]]:
+        """Title, description and keywords found by regex in the start of a page
+        
+        Returns None, so the page gets parsed properly, unless both a title and a
+        description turn up.
+        """
+        head = _HIDDEN_RE.sub('', text[:_HEAD_CHARS])
+        
+        # First non-empty content per (attribute, value), as the DOM lookups pick it
+        metas = {}
+        for tag in _META_TAG_RE.findall(head):
+            attrs = {name.lower(): a or b or c for name, a, b, c in _ATTR_RE.findall(tag)}
+            content = attrs.get('content')
+            if content:
+                for attr in ('property', 'name'):
+                    if attr in attrs and (attr, attrs[attr]) not in metas:
+                        metas[attr, attrs[attr]] = unescape(content)
+        
+        title = metas.get(('property', 'og:title'))
+        if title is None:
+            match = _TITLE_RE.search(head)
+            title = match and unescape(match.group(1)).strip()
+        description = metas.get(('property', 'og:description')) or metas.get(('name', 'description'))
+        if not (title and description):
+            return None
+        
+        return {
+            'fetched_title': title,
+            'description': description,
+            'keywords': metas.get(('name', 'keywords'))
+        }
+    
+    @staticmethod
+    def _parse_html(text: str) -> lxml.html.HtmlElement:
+        """Parse a page with lxml's C HTML parser"""
+        if not text.strip():
+            # lxml refuses empty documents
+            return lxml.html.fromstring('<html></html>')
+        try:
+            return lxml.html.fromstring(text)
+        except ValueError:
+            # Decoded text that still carries an XML encoding declaration
+            return lxml.html.fromstring(text.encode('utf-8'))
+    
+    @staticmethod
+    def _meta_content(tree: lxml.html.HtmlElement, attr: str, value: str) -> Optional[str]:
+        """Content of the first <meta attr="value"> that has a non-empty content"""
+        for content in tree.iterfind(f'.//meta[@{attr}="{value}"]'):
+            content = content.get('content')
+            if content:
+                return content
+        return None
+    
+    def _extract_title(self, tree: lxml.html.HtmlElement) -> Optional[str]:
         """Extract title from HTML"""
         # Try og:title
-        og_title = soup.find('meta', property='og:title')
-        if og_title and og_title.get('content'):
-            return og_title['content']
+        og_title = self._meta_content(tree, 'property', 'og:title')
+        if og_title:
+            return og_title
         
         # Try title tag
-        title = soup.find('title')
-        if title:
-            return title.get_text().strip()
+        title = tree.find('.//title')
+        if title is not None:
+            return title.text_content().strip()
         
         return None
     
-    def _extract_description(self, soup: BeautifulSoup) -> Optional[str]:
+    def _extract_description(self, tree: lxml.html.HtmlElement) -> Optional[str]:
         """Extract description from HTML"""
-        # Try og:description
-        og_desc = soup.find('meta', property='og:description')
-        if og_desc and og_desc.get('content'):
-            return og_desc['content']
-        
-        # Try meta description
-        meta_desc = soup.find('meta', attrs={'name': 'description'})
-        if meta_desc and meta_desc.get('content'):
-            return meta_desc['content']
-        
-        return None
+        # Try og:description, then meta description
+        return (
+            self._meta_content(tree, 'property', 'og:description')
+            or self._meta_content(tree, 'name', 'description')
+        )
     
-    def _extract_keywords(self, soup: BeautifulSoup) -> Optional[str]:
+    def _extract_keywords(self, tree: lxml.html.HtmlElement) -> Optional[str]:
         """Extract keywords from HTML"""
-        meta_keywords = soup.find('meta', attrs={'name': 'keywords'})
-        if meta_keywords and meta_keywords.get('content'):
-            return meta_keywords['content']
-        
-        return None
+        return self._meta_content(tree, 'name', 'keywords')
     
-    def _extract_content(self, soup: BeautifulSoup, max_length: int = 500) -> Optional[str]:
+    def _extract_content(self, tree: lxml.html.HtmlElement, max_length: int = 500) -> Optional[str]:
         """Extract content snippet from HTML"""
         # Remove script and style elements
-        for element in soup(['script', 'style', 'nav', 'header', 'footer']):
-            element.decompose()
+        etree.strip_elements(tree, 'script', 'style', 'nav', 'header', 'footer', with_tail=False)
         
         # Get text
-        text = soup.get_text()
+        text = tree.text_content()
         
-        # Clean up whitespace
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = ' '.join(chunk for chunk in chunks if chunk)
+        # Collapse whitespace runs
+        text = _WS_RE.sub(' ', text).strip()
         
         # Truncate
         if len(text) > max_length:
@@ -123,26 +289,60 @@ class MetadataFetcher:
         self,
         entries: List[Dict[str, Any]]
     ) -> List[Dict[str, Any]]:
-        """Fetch metadata for all entries"""
-        async with httpx.AsyncClient() as client:
-            with Progress(
-                SpinnerColumn(),
-                TextColumn("[progress.description]{task.description}"),
-            ) as progress:
-                task = progress.add_task(
-                    f"Fetching metadata for {len(entries)} entries...",
-                    total=len(entries)
-                )
-                
-                tasks = [
-                    self.fetch_single(client, entry)
-                    for entry in entries
-                ]
-                
-                results = []
-                for coro in asyncio.as_completed(tasks):
-                    result = await coro
-                    results.append(result)
-                    progress.update(task, advance=1)
+        """Fetch metadata for all entries over the shared connection pool"""
+        client = self._get_client()
+        fetches = {}
+        with _progress() as progress:
+            task = progress.add_task(
+                f"Fetching metadata for {len(entries)} entries...",
+                total=len(entries)
+            )
+            
+            async def fetch_one(entry):
+                # fetch_single updates each entry in place
+                await self.fetch_single(entry, client, fetches)
+                progress.update(task, advance=1)
+            
+            await asyncio.gather(*(fetch_one(entry) for entry in entries))
+        
+        return entries
+    
+    async def fetch_metadata_iter(
+        self,
+        entries: List[Dict[str, Any]],
+        show_progress: bool = True
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Fetch metadata for all entries, yielding each entry as soon as it is ready
         
-        return results
+        Callers with their own progress display pass `show_progress=False`.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        pending = iter(entries)
+        client = self._get_client()
+        fetches = {}
+        
+        async def worker():
+            # Workers share one iterator, so only `concurrency_limit` fetches are in flight
+            for entry in pending:
+                queue.put_nowait(await self.fetch_single(entry, client, fetches))
+        
+        async def produce():
+            try:
+                await asyncio.gather(*(worker() for _ in range(self.concurrency_limit)))
+            finally:
+                queue.put_nowait(None)  # No more entries
+        
+        with _progress(disable=not show_progress) as progress:
+            task = progress.add_task(
+                f"Fetching metadata for {len(entries)} entries...",
+                total=len(entries)
+            )
+            
+            producer = asyncio.ensure_future(produce())
+            try:
+                while (entry := await queue.get()) is not None:
+                    progress.update(task, advance=1)
+                    yield entry
+                await producer
+            finally:
+                producer.cancel()
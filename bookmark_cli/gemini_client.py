@@ -1,12 +1,17 @@
 # bookmark-cli/bookmark_cli/gemini_client.py
-import json
+import re
+import asyncio
 import httpx
-from typing import Dict, Any, Optional
+import orjson
+from typing import Dict, Any, List, Optional
 import logging
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 logger = logging.getLogger(__name__)
 
+_FENCE_RE = re.compile(r'```(?:json)?\s*(.*?)```', re.DOTALL)
+_JSON_RE = re.compile(r'\{.*\}|\[.*\]', re.DOTALL)
+
 class GeminiClient:
     """Client for Google Gemini API"""
     
@@ -22,23 +27,50 @@ class GeminiClient:
         }
         self.model_name = model_mapping.get(model_name, model_name)
         self.base_url = "https://generativelanguage.googleapis.com/v1beta/models"
+        self.api_root = "https://generativelanguage.googleapis.com/v1beta"
+        # Fixed per client, so every call and retry reuses them
+        self._endpoint = f"{self.base_url}/{self.model_name}:generateContent"
+        self._params = {"key": self.api_key}
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Get the shared HTTP client, creating it on first use
         
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10)
-    )
-    async def generate(self, prompt: str, system_prompt: Optional[str] = None) -> str:
-        """Send prompt to Gemini and return response"""
-        
-        url = f"{self.base_url}/{self.model_name}:generateContent?key={self.api_key}"
-        
-        # Build the request payload
+        Reusing it keeps the TLS connection to the API open between batches.
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            # The client is bound to the loop it was created on
+            self._client = httpx.AsyncClient(
+                timeout=120.0,
+                http2=True,
+                limits=httpx.Limits(max_keepalive_connections=8)
+            )
+            self._client_loop = loop
+        return self._client
+    
+    async def aclose(self) -> None:
+        """Close the shared HTTP client"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._client_loop = None
+    
+    async def __aenter__(self) -> "GeminiClient":
+        return self
+    
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+    
+    def _build_request(self, prompt: str, system_prompt: Optional[str] = None) -> Dict[str, Any]:
+        """Build a generateContent request body"""
         # Combine system prompt and user prompt for v1beta API
         full_prompt = prompt
         if system_prompt:
             full_prompt = f"{system_prompt}\n\n{prompt}"
         
-        payload = {
+        return {
             "contents": [{
                 "parts": [{"text": full_prompt}]
             }],
@@ -50,25 +82,47 @@ class GeminiClient:
                 "responseMimeType": "application/json"
             }
         }
+    
+    @staticmethod
+    def _extract_text(result: Dict[str, Any]) -> Optional[str]:
+        """Text of the first candidate in a generateContent response"""
+        if "candidates" in result and len(result["candidates"]) > 0:
+            candidate = result["candidates"][0]
+            if "content" in candidate and "parts" in candidate["content"]:
+                parts = candidate["content"]["parts"]
+                if len(parts) > 0 and "text" in parts[0]:
+                    return parts[0]["text"]
+        return None
+        
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=2, max=10)
+    )
+    async def generate(self, prompt: str, system_prompt: Optional[str] = None) -> str:
+        """Send prompt to Gemini and return response"""
+        
+        payload = self._build_request(prompt, system_prompt)
         
         try:
-            async with httpx.AsyncClient(timeout=120.0) as client:
-                response = await client.post(url, json=payload)
-                response.raise_for_status()
-                
-                result = response.json()
-                
-                # Extract text from response
-                if "candidates" in result and len(result["candidates"]) > 0:
-                    candidate = result["candidates"][0]
-                    if "content" in candidate and "parts" in candidate["content"]:
-                        parts = candidate["content"]["parts"]
-                        if len(parts) > 0 and "text" in parts[0]:
-                            return parts[0]["text"]
-                
-                logger.warning(f"Unexpected Gemini response format: {result}")
-                return "{}"
-                
+            # Encoded with orjson; prompts of a few dozen KB are slow through stdlib json
+            response = await self._get_client().post(
+                self._endpoint,
+                params=self._params,
+                content=orjson.dumps(payload),
+                headers={"content-type": "application/json"}
+            )
+            response.raise_for_status()
+            
+            result = response.json()
+            
+            # Extract text from response
+            text = self._extract_text(result)
+            if text is not None:
+                return text
+            
+            logger.warning(f"Unexpected Gemini response format: {result}")
+            return "{}"
+            
         except httpx.HTTPStatusError as e:
             logger.error(f"Gemini API error: {e.response.status_code} - {e.response.text}")
             raise
@@ -79,39 +133,92 @@ class GeminiClient:
     async def generate_json(self, prompt: str, system_prompt: str) -> Dict[str, Any]:
         """Generate and parse JSON response from Gemini"""
         response = await self.generate(prompt, system_prompt)
-        
+        return self._parse_json(response)
+    
+    @staticmethod
+    def _parse_json(response: str) -> Any:
+        """Parse JSON from a Gemini response, unwrapping markdown fences if present"""
         try:
             # Gemini should return JSON directly due to responseMimeType
-            # But let's try to extract it if it's wrapped
             response = response.strip()
+            if not response.startswith(('[', '{')):
+                # Otherwise take the fenced block, if any, and within it the span from
+                # the first opening bracket to the last closing one
+                fenced = _FENCE_RE.search(response)
+                if fenced:
+                    response = fenced.group(1)
+                match = _JSON_RE.search(response)
+                if match:
+                    response = match.group()
             
-            # Try to find JSON in the response
-            if response.startswith('[') or response.startswith('{'):
-                return json.loads(response)
-            
-            # Look for JSON in markdown code blocks
-            if '```json' in response:
-                start = response.find('```json') + 7
-                end = response.find('```', start)
-                json_str = response[start:end].strip()
-                return json.loads(json_str)
-            
-            # Try to find any JSON
-            json_start = max(response.find('['), response.find('{'))
-            if json_start != -1:
-                if response[json_start] == '[':
-                    json_end = response.rfind(']') + 1
-                else:
-                    json_end = response.rfind('}') + 1
-                
-                if json_end > json_start:
-                    json_str = response[json_start:json_end]
-                    return json.loads(json_str)
+            return orjson.loads(response)
             
-            # If all else fails, try to parse the whole thing
-            return json.loads(response)
-            
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             logger.error(f"Failed to parse JSON from Gemini: {e}")
             logger.debug(f"Response was: {response}")
             return []
+    
+    async def batch_generate_json(
+        self,
+        prompts: List[str],
+        system_prompt: str,
+        poll_interval: float = 30.0
+    ) -> List[Any]:
+        """Run prompts through the Gemini Batch API and return parsed JSON per prompt
+        
+        Batch jobs are billed at half the interactive price and are not subject to
+        per-request rate limits, but may take minutes (up to 24h) to complete.
+        Prompts whose request failed come back as an empty list.
+        """
+        requests = [
+            {
+                "request": self._build_request(prompt, system_prompt),
+                "metadata": {"key": f"batch_{i}"}
+            }
+            for i, prompt in enumerate(prompts)
+        ]
+        body = {
+            "batch": {
+                "display_name": f"bookmark-cli-{len(prompts)}",
+                "input_config": {"requests": {"requests": requests}}
+            }
+        }
+        
+        client = self._get_client()
+        response = await client.post(
+            f"{self.base_url}/{self.model_name}:batchGenerateContent",
+            params=self._params,
+            content=orjson.dumps(body),
+            headers={"content-type": "application/json"}
+        )
+        response.raise_for_status()
+        job = response.json()
+        logger.info(f"Submitted Gemini batch job {job.get('name')} with {len(prompts)} requests")
+        
+        while not job.get("done"):
+            await asyncio.sleep(poll_interval)
+            response = await client.get(
+                f"{self.api_root}/{job['name']}",
+                params=self._params
+            )
+            response.raise_for_status()
+            job = response.json()
+            logger.debug(f"Gemini batch job state: {job.get('metadata', {}).get('state')}")
+        
+        state = job.get("metadata", {}).get("state")
+        if "error" in job or state != "BATCH_STATE_SUCCEEDED":
+            raise RuntimeError(f"Gemini batch job {job.get('name')} ended with {state}: {job.get('error')}")
+        
+        results: List[Any] = [[] for _ in prompts]
+        inlined = job.get("response", {}).get("inlinedResponses", {}).get("inlinedResponses", [])
+        for i, item in enumerate(inlined):
+            # Responses carry the key of their request; fall back to position
+            key = item.get("metadata", {}).get("key", f"batch_{i}")
+            idx = int(key.rsplit("_", 1)[1])
+            if "error" in item:
+                logger.error(f"Gemini batch request {key} failed: {item['error']}")
+                continue
+            text = self._extract_text(item.get("response", {}))
+            if text is not None:
+                results[idx] = self._parse_json(text)
+        return results
@@ -1,15 +1,44 @@
 # bookmark-cli/bookmark_cli/llm_client.py
-import json
 import asyncio
 from typing import List, Dict, Any, Optional
 import httpx
 from tenacity import retry, stop_after_attempt, wait_exponential
 import logging
+import orjson
 
 from .gemini_client import GeminiClient
+from .utils import split_scheme_netloc
 
 logger = logging.getLogger(__name__)
 
+_SYSTEM_PROMPT = """You are a bookmark organizer. Analyze each bookmark's title, URL, description, and domain to categorize it into a meaningful folder.
+
+For each bookmark in the input array, return a JSON object with:
+- id: same as input (required)
+- folder: Descriptive category name based on content and purpose
+- tags: 2-4 relevant keywords (lowercase, descriptive)
+
+Folder naming guidelines:
+- Create specific, meaningful categories (e.g., "Web Development", "AI & Machine Learning", "Design Resources")
+- Group by topic, technology, or purpose
+- Use title case for folder names
+- Keep names concise but descriptive (2-4 words)
+- Common categories: Development, Learning, News, Tools, Reference, Entertainment, Research, Documentation
+
+Tag guidelines:
+- Extract key technologies, topics, or themes
+- Use lowercase, single words or short phrases
+- Be specific (e.g., "python", "react", "tutorial", "api", "documentation")
+
+Output format: JSON array with id, folder, and tags fields.
+
+Example:
+[
+  {"id": "1", "folder": "Web Development", "tags": ["javascript", "react", "tutorial"]},
+  {"id": "2", "folder": "AI & Machine Learning", "tags": ["chatgpt", "llm", "api"]},
+  {"id": "3", "folder": "Design Resources", "tags": ["ui", "icons", "tools"]}
+]"""
+
 class LLMClient:
     def __init__(
         self,
@@ -35,6 +64,17 @@ class LLMClient:
         else:
             raise ValueError(f"Unsupported provider: {provider}")
         
+    async def aclose(self) -> None:
+        """Close the provider client's pooled connections"""
+        if self.provider == "gemini":
+            await self.client.aclose()
+    
+    async def __aenter__(self) -> "LLMClient":
+        return self
+    
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+        
     def _get_base_url(self) -> str:
         """Get API base URL based on provider"""
         if self.provider == "openai":
@@ -48,7 +88,7 @@ class LLMClient:
         """Categorize a batch of bookmarks using LLM"""
         
         system_prompt = self._get_system_prompt()
-        user_prompt = json.dumps(batch, ensure_ascii=False)
+        user_prompt = orjson.dumps(batch).decode('utf-8')
         
         # Use Gemini or other cloud APIs
         if self.provider == "gemini":
@@ -60,6 +100,31 @@ class LLMClient:
         else:
             raise ValueError(f"Unsupported provider: {self.provider}")
         
+        return self._normalize_response(response, batch)
+    
+    async def categorize_batches_via_batch_api(
+        self,
+        batches: List[List[Dict[str, Any]]],
+        poll_interval: float = 30.0
+    ) -> List[List[Dict[str, Any]]]:
+        """Categorize many batches in one offline batch job, returning results per batch
+        
+        Only supported for Gemini (batch mode is half the price of interactive calls).
+        """
+        if self.provider != "gemini":
+            raise ValueError(f"Batch mode is not supported for provider: {self.provider}")
+        
+        system_prompt = self._get_system_prompt()
+        prompts = [orjson.dumps(batch).decode('utf-8') for batch in batches]
+        responses = await self.client.batch_generate_json(prompts, system_prompt, poll_interval)
+        
+        return [
+            self._normalize_response(response, batch)
+            for response, batch in zip(responses, batches)
+        ]
+    
+    def _normalize_response(self, response: Any, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Validate a parsed LLM response for a batch, falling back per batch on bad output"""
         try:
             if not isinstance(response, list):
                 response = [response] if isinstance(response, dict) else []
@@ -94,33 +159,7 @@ class LLMClient:
     
     def _get_system_prompt(self) -> str:
         """System prompt for bookmark categorization"""
-        return """You are a bookmark organizer. Analyze each bookmark's title, URL, description, and domain to categorize it into a meaningful folder.
-
-For each bookmark in the input array, return a JSON object with:
-- id: same as input (required)
-- folder: Descriptive category name based on content and purpose
-- tags: 2-4 relevant keywords (lowercase, descriptive)
-
-Folder naming guidelines:
-- Create specific, meaningful categories (e.g., "Web Development", "AI & Machine Learning", "Design Resources")
-- Group by topic, technology, or purpose
-- Use title case for folder names
-- Keep names concise but descriptive (2-4 words)
-- Common categories: Development, Learning, News, Tools, Reference, Entertainment, Research, Documentation
-
-Tag guidelines:
-- Extract key technologies, topics, or themes
-- Use lowercase, single words or short phrases
-- Be specific (e.g., "python", "react", "tutorial", "api", "documentation")
-
-Output format: JSON array with id, folder, and tags fields.
-
-Example:
-[
-  {"id": "1", "folder": "Web Development", "tags": ["javascript", "react", "tutorial"]},
-  {"id": "2", "folder": "AI & Machine Learning", "tags": ["chatgpt", "llm", "api"]},
-  {"id": "3", "folder": "Design Resources", "tags": ["ui", "icons", "tools"]}
-]"""
+        return _SYSTEM_PROMPT
     
     def _validate_item(self, item: Dict[str, Any], batch: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Validate and normalize a single LLM response item"""
@@ -179,11 +218,10 @@ Example:
             
             if url:
                 try:
-                    from urllib.parse import urlparse
-                    domain = urlparse(url).netloc
+                    domain = split_scheme_netloc(url)[1]
                     if domain:
-                        folder = domain.split('.')[0].title()
-                except:
+                        folder = domain.partition('.')[0].title()
+                except ValueError:
                     pass
             
             if folder == "Unsorted" and entry.get("domain"):
@@ -198,7 +236,9 @@ Example:
                 "id": entry.get("id", ""),
                 "folder": folder,
                 "tags": [],
-                "confidence": 0.3
+                "confidence": 0.3,
+                # A guess from the URL rather than model output, so callers don't cache it
+                "fallback": True
             })
         return fallback
     
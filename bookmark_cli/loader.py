@@ -1,91 +1,127 @@
 # bookmark-cli/bookmark_cli/loader.py
-import json
+import orjson
 import uuid
-from typing import Dict, List, Any
+from typing import Dict, List, Any, IO, Union
 from pathlib import Path
-from bs4 import BeautifulSoup
+from html.parser import HTMLParser
 import time
 
-def load_chrome_bookmarks(filepath: Path) -> Dict[str, Any]:
-    """Load Chrome bookmarks JSON file"""
-    with open(filepath, 'r', encoding='utf-8') as f:
-        return json.load(f)
+def load_chrome_bookmarks(filepath: Union[Path, IO]) -> Dict[str, Any]:
+    """Load Chrome bookmarks JSON file, given as a path or an open (text or binary) file"""
+    if hasattr(filepath, 'read'):
+        return load_chrome_bookmarks_bytes(filepath.read())
+    with open(filepath, 'rb') as f:
+        return load_chrome_bookmarks_bytes(f.read())
+
+def load_chrome_bookmarks_bytes(data: bytes) -> Dict[str, Any]:
+    """Load Chrome bookmarks JSON from an in-memory buffer"""
+    return orjson.loads(data)
 
 def load_chrome_bookmarks_html(filepath: Path) -> List[Dict[str, Any]]:
     """Load Chrome bookmarks HTML file and convert to flat list"""
     with open(filepath, 'r', encoding='utf-8') as f:
         html_content = f.read()
     
-    soup = BeautifulSoup(html_content, 'html.parser')
-    bookmarks = []
+    return _parse_bookmarks_html(html_content)
+
+def load_chrome_bookmarks_html_bytes(data: bytes) -> List[Dict[str, Any]]:
+    """Load Chrome bookmarks HTML from an in-memory buffer and convert to flat list"""
+    return _parse_bookmarks_html(data.decode('utf-8'))
+
+class _BookmarksHTMLParser(HTMLParser):
+    """Single streaming pass over Netscape bookmarks markup, tracking the folder stack
     
-    # Simply find all anchor tags and extract their parent folder
-    all_anchors = soup.find_all('a')
+    Every <DL> opens the folder named by the <H3> just before it, and its </DL>
+    closes it, so each anchor's folder is simply the top of the stack.
+    """
     
-    for anchor in all_anchors:
-        url = anchor.get('href', '')
-        if not url:
-            continue
-            
-        title = anchor.get_text(strip=True)
-        add_date = anchor.get('add_date', str(int(time.time())))
-        
-        # Try to find the parent folder by looking for H3 tags above this anchor
-        parent_folder = "Root"
-        dt_parent = anchor.find_parent('dt')
-        if dt_parent:
-            # Look backwards for the last H3 (folder)
-            prev_h3 = None
-            for prev in dt_parent.find_all_previous('h3'):
-                prev_h3 = prev
-                break
-            if prev_h3:
-                parent_folder = prev_h3.get_text(strip=True)
-        
-        bookmark = {
-            'id': str(uuid.uuid4()),
-            'url': url,
-            'title': title,
-            'date_added': add_date,
-            'parent': parent_folder,
-            'meta': {}
-        }
-        bookmarks.append(bookmark)
+    def __init__(self):
+        super().__init__()
+        self.bookmarks: List[Dict[str, Any]] = []
+        self.folder_stack = ["Root"]
+        self.pending_folder = None  # Name of the last <H3>, opened by the next <DL>
+        self.now = str(int(time.time()))
+        self._text = None  # Text being collected for the open <H3> or <A>
+        self._anchor = None
     
-    return bookmarks
+    def handle_starttag(self, tag, attrs):
+        if tag == 'a':
+            self._anchor = dict(attrs)
+            self._text = []
+        elif tag == 'h3':
+            self._text = []
+        elif tag == 'dl':
+            self.folder_stack.append(self.pending_folder or self.folder_stack[-1])
+            self.pending_folder = None
+    
+    def handle_endtag(self, tag):
+        if tag == 'a' and self._anchor is not None:
+            url = self._anchor.get('href') or ''
+            if url:
+                self.bookmarks.append({
+                    'id': str(uuid.uuid4()),
+                    'url': url,
+                    'title': ''.join(self._text).strip(),
+                    'date_added': self._anchor.get('add_date') or self.now,
+                    'parent': self.folder_stack[-1],
+                    'meta': {}
+                })
+            self._anchor = None
+            self._text = None
+        elif tag == 'h3' and self._text is not None:
+            self.pending_folder = ''.join(self._text).strip()
+            self._text = None
+        elif tag == 'dl' and len(self.folder_stack) > 1:
+            self.folder_stack.pop()
+    
+    def handle_data(self, data):
+        if self._text is not None:
+            self._text.append(data)
+
+def _parse_bookmarks_html(html_content: str) -> List[Dict[str, Any]]:
+    """Convert Chrome bookmarks HTML markup to flat list"""
+    parser = _BookmarksHTMLParser()
+    parser.feed(html_content)
+    parser.close()
+    return parser.bookmarks
 
 def flatten_bookmarks(bookmarks: Dict[str, Any]) -> List[Dict[str, Any]]:
     """Flatten nested Chrome bookmarks structure"""
     flattened = []
+    append = flattened.append
     
-    def process_node(node: Dict[str, Any], parent_name: str = "", parent_id: str = ""):
+    # Explicit depth-first walk (no recursion limit on deep folders); children are
+    # pushed in reverse so they pop, and come out, in their original order
+    roots = bookmarks.get("roots", {})
+    stack = [
+        (roots[root_key], root_key.replace("_", " ").title(), "")
+        for root_key in reversed(["bookmark_bar", "other", "synced"])
+        if root_key in roots
+    ]
+    while stack:
+        node, parent_name, parent_id = stack.pop()
         node_type = node.get("type", "folder")
         
         if node_type == "folder":
             folder_name = node.get("name", "")
-            folder_id = node.get("id", str(uuid.uuid4()))
+            # Only draw a UUID when the node really has no id
+            folder_id = node["id"] if "id" in node else str(uuid.uuid4())
             
             # Process children
-            children = node.get("children", [])
-            for child in children:
-                process_node(child, folder_name, folder_id)
+            stack.extend(
+                (child, folder_name, folder_id)
+                for child in reversed(node.get("children", []))
+            )
         
         elif node_type == "url":
-            entry = {
-                "id": node.get("id", str(uuid.uuid4())),
+            append({
+                "id": node["id"] if "id" in node else str(uuid.uuid4()),
                 "url": node.get("url"),
                 "title": node.get("name", ""),
                 "date_added": node.get("date_added", ""),
                 "parent": parent_name,
                 "original_parent_id": parent_id,
                 "meta": {}
-            }
-            flattened.append(entry)
-    
-    # Start processing from roots
-    roots = bookmarks.get("roots", {})
-    for root_key in ["bookmark_bar", "other", "synced"]:
-        if root_key in roots:
-            process_node(roots[root_key], root_key.replace("_", " ").title())
+            })
     
     return flattened
\ No newline at end of file
@@ -1,19 +1,24 @@
 # bookmark-cli/bookmark_cli/normalizer.py
+from functools import lru_cache
 from urllib.parse import urlparse, urlunparse
 from typing import List, Tuple, Dict, Any
-import tldextract
 
 def normalize_url(url: str) -> str:
-    """Normalize URL for deduplication"""
+    """Normalize URL for deduplication; anything but a non-empty string comes back unchanged"""
     if not url or not isinstance(url, str):
         return url
-    
+    return _normalize_url(url)
+
+# Memoized, since bookmark dumps repeat the same URLs. 65536 covers every URL of even
+# a large export (tens of thousands of bookmarks) for a few MB of strings at most.
+@lru_cache(maxsize=65536)
+def _normalize_url(url: str) -> str:
     try:
         parsed = urlparse(url)
         
-        # Lowercase scheme and hostname
+        # Lowercase scheme and hostname (.hostname is already lowercased)
         scheme = parsed.scheme.lower()
-        hostname = parsed.hostname.lower() if parsed.hostname else ""
+        hostname = parsed.hostname or ""
         
         # Remove default ports
         port = parsed.port
@@ -48,19 +53,18 @@ def deduplicate_entries(entries: List[Dict[str, Any]]) -> Tuple[List[Dict[str, A
     removed = []
     
     for entry in sorted_entries:
-        if not entry.get('url'):
+        url = entry.get('url')
+        if not url:
             # Keep entries without URL (folders/comments)
             deduped.append(entry)
             continue
         
-        normalized = normalize_url(entry['url'])
-        
-        if normalized not in url_map:
-            url_map[normalized] = entry
+        # One lookup both claims the URL for this entry and finds an earlier owner
+        kept_entry = url_map.setdefault(normalize_url(url), entry)
+        if kept_entry is entry:
             deduped.append(entry)
         else:
             # This is a duplicate
-            kept_entry = url_map[normalized]
             removed.append((entry, kept_entry))
     
     return deduped, removed
\ No newline at end of file
@@ -1,11 +1,16 @@
 # bookmark-cli/bookmark_cli/preview.py
-import json
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Optional, Tuple
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
 from rich import print as rprint
 from collections import defaultdict, Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import orjson
+
+# Folder counts above this are listed as plain text instead of a rich Table
+_MAX_TABLE_ROWS = 200
 
 def generate_preview(entries: List[Dict[str, Any]]) -> Dict[str, Any]:
     """Generate preview data for categorized bookmarks"""
@@ -14,63 +19,80 @@ def generate_preview(entries: List[Dict[str, Any]]) -> Dict[str, Any]:
     total = len(entries)
     
     folders = defaultdict(list)
-    tags_counter = Counter()
+    # Tags are gathered into one list and counted once in C, which beats
+    # updating a Counter per entry (entries carry only a handful of tags)
+    all_tags = []
     domain_counter = Counter()
+    # Per-folder running totals for the coherence scores
+    confidence_sums = defaultdict(float)
+    folder_domains = defaultdict(set)
+    original_folders = defaultdict(int)
+    broken_count = 0
+    unsorted_count = 0
     
+    # One pass over the entries for every per-entry count
     for entry in entries:
         folder = entry.get("folder", "Unsorted")
         folders[folder].append(entry)
+        if folder == "Unsorted":
+            unsorted_count += 1
+        confidence_sums[folder] += entry.get("confidence", 0)
         
-        for tag in entry.get("extra_tags", []):
-            tags_counter[tag] += 1
+        original_folders[entry.get("parent", "Unknown")] += 1
+        if entry.get("primary_tag") == "broken":
+            broken_count += 1
+        
+        all_tags.extend(entry.get("extra_tags") or ())
         
         domain = entry.get("domain", "")
         if domain:
             domain_counter[domain] += 1
+            folder_domains[folder].add(domain)
     
     # Calculate folder coherence scores
     folder_stats = {}
     for folder_name, folder_items in folders.items():
         if folder_items:
-            confidences = [item.get("confidence", 0) for item in folder_items]
-            avg_confidence = sum(confidences) / len(confidences)
+            count = len(folder_items)
+            avg_confidence = confidence_sums[folder_name] / count
             
             # Check if items share domain
-            domains = [item.get("domain") for item in folder_items]
-            unique_domains = len(set(d for d in domains if d))
-            domain_coherence = 1 - (unique_domains / max(len(domains), 1))
+            domain_coherence = 1 - (len(folder_domains[folder_name]) / count)
             
             folder_stats[folder_name] = {
-                "count": len(folder_items),
+                "count": count,
                 "avg_confidence": round(avg_confidence, 2),
                 "domain_coherence": round(domain_coherence, 2),
-                "items": folder_items[:10]  # Preview first 10 items
+                "item_ids": [item.get("id") for item in folder_items[:10]]  # Preview first 10 items
             }
     
     # Get top tags
-    top_tags = tags_counter.most_common(10)
+    top_tags = Counter(all_tags).most_common(10)
     
     # Get domain distribution
     top_domains = domain_counter.most_common(10)
     
-    # Compare with original folders if available
-    original_folders = defaultdict(int)
-    for entry in entries:
-        original_folder = entry.get("parent", "Unknown")
-        original_folders[original_folder] += 1
-    
     return {
         "total_bookmarks": total,
         "folders": folder_stats,
+        "first_folder": next(iter(folder_stats), None),  # Sampled by show_preview
         "top_tags": top_tags,
         "top_domains": top_domains,
         "original_folders": dict(original_folders),
-        "broken_count": len([e for e in entries if e.get("primary_tag") == "broken"]),
-        "unsorted_count": len([e for e in entries if e.get("folder") == "Unsorted"])
+        "broken_count": broken_count,
+        "unsorted_count": unsorted_count
     }
 
-def show_preview(preview_data: Dict[str, Any], console: Console) -> bool:
-    """Display preview and ask for confirmation"""
+def show_preview(
+    preview_data: Dict[str, Any],
+    console: Console,
+    entries: Optional[List[Dict[str, Any]]] = None
+) -> bool:
+    """Display preview and ask for confirmation
+    
+    `entries` (the bookmarks the preview was generated from) supply the sample
+    items, which the preview data only references by id.
+    """
     
     console.clear()
     console.print(Panel.fit("[bold cyan]Bookmark Organizer Preview[/bold cyan]"))
@@ -84,21 +106,32 @@ def show_preview(preview_data: Dict[str, Any], console: Console) -> bool:
     
     # Folder preview
     console.print("\n[bold]Folder Structure:[/bold]")
-    folder_table = Table(show_header=True, header_style="bold magenta")
-    folder_table.add_column("Folder", style="cyan")
-    folder_table.add_column("Count", style="green")
-    folder_table.add_column("Avg Confidence", style="yellow")
-    folder_table.add_column("Domain Coherence", style="blue")
-    
-    for folder_name, stats in preview_data["folders"].items():
-        folder_table.add_row(
-            folder_name[:30],
-            str(stats["count"]),
-            f"{stats['avg_confidence']:.2f}",
-            f"{stats['domain_coherence']:.2f}"
+    folders = preview_data["folders"]
+    if len(folders) > _MAX_TABLE_ROWS:
+        # Rich measures every cell to lay out a Table, which crawls with thousands of rows
+        lines = [f"{'Folder':<30} {'Count':>6} {'Avg Confidence':>14} {'Domain Coherence':>16}"]
+        lines.extend(
+            f"{folder_name[:30]:<30} {stats['count']:>6} "
+            f"{stats['avg_confidence']:>14.2f} {stats['domain_coherence']:>16.2f}"
+            for folder_name, stats in folders.items()
         )
-    
-    console.print(folder_table)
+        console.print("\n".join(lines), markup=False, highlight=False)
+    else:
+        folder_table = Table(show_header=True, header_style="bold magenta")
+        folder_table.add_column("Folder", style="cyan")
+        folder_table.add_column("Count", style="green")
+        folder_table.add_column("Avg Confidence", style="yellow")
+        folder_table.add_column("Domain Coherence", style="blue")
+        
+        for folder_name, stats in folders.items():
+            folder_table.add_row(
+                folder_name[:30],
+                str(stats["count"]),
+                f"{stats['avg_confidence']:.2f}",
+                f"{stats['domain_coherence']:.2f}"
+            )
+        
+        console.print(folder_table)
     
     # Top tags
     console.print("\n[bold]Top 10 Tags:[/bold]")
@@ -112,10 +145,17 @@ def show_preview(preview_data: Dict[str, Any], console: Console) -> bool:
     console.print(tags_table)
     
     # Sample items from first folder
-    first_folder = next(iter(preview_data["folders"].values()), None)
-    if first_folder and first_folder["items"]:
+    first_folder = preview_data["folders"].get(preview_data.get("first_folder"))
+    if first_folder and first_folder["item_ids"] and entries:
+        sample_ids = first_folder["item_ids"][:5]
+        wanted = set(sample_ids)
+        by_id = {entry.get("id"): entry for entry in entries if entry.get("id") in wanted}
+        sample = [by_id[item_id] for item_id in sample_ids if item_id in by_id]
+    else:
+        sample = []
+    if sample:
         console.print("\n[bold]Sample Items (first folder):[/bold]")
-        for i, item in enumerate(first_folder["items"][:5], 1):
+        for i, item in enumerate(sample, 1):
             title = item.get("title", "No title")[:50]
             url = item.get("url", "No URL")[:40]
             console.print(f"  {i}. {title}")
@@ -123,10 +163,18 @@ def show_preview(preview_data: Dict[str, Any], console: Console) -> bool:
     
     # Ask for confirmation
     console.print("\n" + "="*50)
-    response = input("\nDo you want to proceed with this organization? (y/N): ")
     
-    # Save preview data
-    with open("preview.diff", "w") as f:
-        json.dump(preview_data, f, indent=2)
+    # Save preview data in the background while the user makes up their mind
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        written = executor.submit(_write_diff, preview_data)
+        response = input("\nDo you want to proceed with this organization? (y/N): ")
+        written.result()
     
-    return response.lower() in ["y", "yes"]
\ No newline at end of file
+    return response.lower() in ["y", "yes"]
+
+def _write_diff(preview_data: Dict[str, Any], path: str = "preview.diff"):
+    """Save preview data as indented JSON"""
+    # Folder names key the stats, and an LLM result can leave a folder null;
+    # OPT_NON_STR_KEYS writes that key as "null", as json.dump did
+    with open(path, "wb") as f:
+        f.write(orjson.dumps(preview_data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
\ No newline at end of file
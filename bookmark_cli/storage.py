@@ -1,95 +1,164 @@
 # bookmark-cli/bookmark_cli/storage.py
 import json
 import sqlite3
-from typing import Dict, Any, Optional
+import threading
+from typing import Dict, Any, Iterable, List, Optional, Tuple
 from pathlib import Path
 from datetime import datetime
 
+_METADATA_COLUMNS = "url, title, description, content_type, status_code, domain, last_modified, fetch_success, timestamp"
+
 class CacheStorage:
     def __init__(self, cache_path: Path = Path(".bookmark_cache")):
         self.cache_path = cache_path
         self.cache_path.mkdir(exist_ok=True)
         
-        # Initialize SQLite cache
+        # Initialize SQLite cache. One connection for the storage's lifetime;
+        # callers reach it from worker threads (asyncio.to_thread), so access
+        # is serialized with a lock rather than tied to the creating thread.
         self.db_path = cache_path / "metadata.db"
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._get_sql = f"SELECT {_METADATA_COLUMNS} FROM metadata_cache WHERE url = ?"
         self._init_db()
     
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            # Fold the write-ahead log back into the database so no -wal file lingers
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self._conn.close()
+    
+    def __enter__(self) -> "CacheStorage":
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
     def _init_db(self):
         """Initialize SQLite database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS metadata_cache (
-                url TEXT PRIMARY KEY,
-                title TEXT,
-                description TEXT,
-                content_type TEXT,
-                status_code INTEGER,
-                domain TEXT,
-                last_modified TEXT,
-                fetch_success BOOLEAN,
-                timestamp DATETIME
-            )
-        """)
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS llm_cache (
-                hash TEXT PRIMARY KEY,
-                response TEXT,
-                timestamp DATETIME
-            )
-        """)
+        with self._lock, self._conn as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS metadata_cache (
+                    url TEXT PRIMARY KEY,
+                    title TEXT,
+                    description TEXT,
+                    content_type TEXT,
+                    status_code INTEGER,
+                    domain TEXT,
+                    last_modified TEXT,
+                    fetch_success BOOLEAN,
+                    timestamp DATETIME
+                )
+            """)
+            
+            # url is covered by the primary key; domain is what cached rows get grouped by
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_metadata_domain ON metadata_cache(domain)")
+            
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    hash TEXT PRIMARY KEY,
+                    response TEXT,
+                    timestamp DATETIME
+                )
+            """)
         
-        conn.commit()
-        conn.close()
+        with self._lock:
+            # WAL lets lookups read while a batch is being written (it needs the
+            # cache directory to be writable, for the -wal and -shm files), and
+            # mmap serves warm reads from the page cache without read() calls
+            for pragma in (
+                "journal_mode=WAL",
+                "synchronous=NORMAL",
+                "mmap_size=268435456",
+                "temp_store=MEMORY",
+                "cache_size=-65536",
+            ):
+                self._conn.execute(f"PRAGMA {pragma}")
     
     def get_metadata(self, url: str) -> Optional[Dict[str, Any]]:
         """Get cached metadata for URL"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            "SELECT * FROM metadata_cache WHERE url = ?",
-            (url,)
-        )
-        row = cursor.fetchone()
-        conn.close()
+        # Same SQL text every call, so sqlite3's statement cache keeps it prepared
+        with self._lock:
+            row = self._conn.execute(self._get_sql, (url,)).fetchone()
         
         if row:
-            return {
-                "url": row[0],
-                "title": row[1],
-                "description": row[2],
-                "content_type": row[3],
-                "status_code": row[4],
-                "domain": row[5],
-                "last_modified": row[6],
-                "fetch_success": bool(row[7]),
-                "timestamp": row[8]
-            }
+            return self._metadata_from_row(row)
         return None
     
+    def get_metadata_many(self, urls: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Get cached metadata for many URLs at once, keyed by URL and skipping misses"""
+        rows = self._select_in(f"SELECT {_METADATA_COLUMNS} FROM metadata_cache WHERE url IN ({{}})", urls)
+        return {row[0]: self._metadata_from_row(row) for row in rows}
+    
+    def _select_in(self, sql: str, keys: Iterable[str]) -> List[tuple]:
+        """Rows of `sql` with its `IN ({})` filled in for all of `keys`"""
+        keys = list(keys)
+        rows = []
+        
+        with self._lock:
+            # Stay under SQLite's limit on bound parameters per statement
+            for i in range(0, len(keys), 900):
+                chunk = keys[i:i + 900]
+                rows.extend(self._conn.execute(sql.format(','.join('?' * len(chunk))), chunk).fetchall())
+        
+        return rows
+    
+    @staticmethod
+    def _metadata_from_row(row: tuple) -> Dict[str, Any]:
+        """Metadata dict for a row selected with _METADATA_COLUMNS"""
+        return {
+            "url": row[0],
+            "title": row[1],
+            "description": row[2],
+            "content_type": row[3],
+            "status_code": row[4],
+            "domain": row[5],
+            "last_modified": row[6],
+            "fetch_success": bool(row[7]),
+            "timestamp": row[8]
+        }
+    
     def save_metadata(self, url: str, metadata: Dict[str, Any]):
         """Save metadata to cache"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        self.save_metadata_bulk([(url, metadata)])
+    
+    def save_metadata_bulk(self, items: Iterable[Tuple[str, Dict[str, Any]]]):
+        """Save (url, metadata) pairs to cache in a single transaction"""
+        timestamp = datetime.now().isoformat()
+        rows = [
+            (
+                url,
+                metadata.get("title"),
+                metadata.get("description"),
+                metadata.get("content_type"),
+                metadata.get("status_code", 0),
+                metadata.get("domain"),
+                metadata.get("last_modified"),
+                metadata.get("fetch_success", False),
+                timestamp
+            )
+            for url, metadata in items
+        ]
         
-        cursor.execute("""
-            INSERT OR REPLACE INTO metadata_cache 
-            (url, title, description, content_type, status_code, domain, last_modified, fetch_success, timestamp)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            url,
-            metadata.get("title"),
-            metadata.get("description"),
-            metadata.get("content_type"),
-            metadata.get("status_code", 0),
-            metadata.get("domain"),
-            metadata.get("last_modified"),
-            metadata.get("fetch_success", False),
-            datetime.now().isoformat()
-        ))
+        with self._lock, self._conn as conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO metadata_cache ({_METADATA_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+    
+    def get_llm_responses(self, hashes: Iterable[str]) -> Dict[str, Any]:
+        """Get cached LLM responses for the given content hashes, skipping misses"""
+        rows = self._select_in("SELECT hash, response FROM llm_cache WHERE hash IN ({})", hashes)
+        return {key: json.loads(response) for key, response in rows}
+    
+    def save_llm_responses(self, responses: Dict[str, Any]):
+        """Save LLM responses keyed by content hash"""
+        timestamp = datetime.now().isoformat()
+        rows = [(key, json.dumps(response), timestamp) for key, response in responses.items()]
         
-        conn.commit()
-        conn.close()
\ No newline at end of file
+        with self._lock, self._conn as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO llm_cache (hash, response, timestamp) VALUES (?, ?, ?)",
+                rows
+            )
@@ -2,41 +2,48 @@
 import pytest
 from bookmark_cli.normalizer import normalize_url, deduplicate_entries
 
-def test_normalize_url():
-    # Test basic normalization
-    assert normalize_url("https://Example.com:443/path/") == "https://example.com/path"
-    assert normalize_url("http://example.com:80/path") == "http://example.com/path"
-    
-    # Test preserving query and fragment
-    assert normalize_url("https://example.com/path?query=1#fragment") == "https://example.com/path?query=1#fragment"
-    
-    # Test with different ports
-    assert normalize_url("https://example.com:8080/path") == "https://example.com:8080/path"
-    
-    # Test invalid URL
-    assert normalize_url("not-a-url") == "not-a-url"
+@pytest.mark.parametrize("url,expected", [
+    # Basic normalization
+    ("https://Example.com:443/path/", "https://example.com/path"),
+    ("http://example.com:80/path", "http://example.com/path"),
+    # Query and fragment are preserved
+    ("https://example.com/path?query=1#fragment", "https://example.com/path?query=1#fragment"),
+    # Non-default ports are kept
+    ("https://example.com:8080/path", "https://example.com:8080/path"),
+    # Invalid URL
+    ("not-a-url", "not-a-url"),
+    # Not a string, including unhashable input the cache can't key on
+    (None, None),
+    (["x"], ["x"]),
+])
+def test_normalize_url(url, expected):
+    assert normalize_url(url) == expected
+
+_DEDUP_ENTRIES = [
+    {
+        "id": "1",
+        "url": "https://example.com/path",
+        "title": "Example 1",
+        "date_added": "1000"
+    },
+    {
+        "id": "2",
+        "url": "https://EXAMPLE.com/path/",  # Same after normalization
+        "title": "Example 2",
+        "date_added": "2000"
+    },
+    {
+        "id": "3",
+        "url": "https://other.com/path",
+        "title": "Other",
+        "date_added": "1500"
+    }
+]
 
-def test_deduplicate_entries():
-    entries = [
-        {
-            "id": "1",
-            "url": "https://example.com/path",
-            "title": "Example 1",
-            "date_added": "1000"
-        },
-        {
-            "id": "2",
-            "url": "https://EXAMPLE.com/path/",  # Same after normalization
-            "title": "Example 2",
-            "date_added": "2000"
-        },
-        {
-            "id": "3",
-            "url": "https://other.com/path",
-            "title": "Other",
-            "date_added": "1500"
-        }
-    ]
+# The oldest duplicate wins whatever order the entries arrive in
+@pytest.mark.parametrize("order", [(0, 1, 2), (1, 0, 2), (2, 1, 0)])
+def test_deduplicate_entries(order):
+    entries = [_DEDUP_ENTRIES[i] for i in order]
     
     deduped, removed = deduplicate_entries(entries)
     
@@ -0,0 +1,214 @@
+# bookmark-cli/tests/test_categorizer.py
+import asyncio
+import orjson
+from bookmark_cli.categorizer import (
+    build_folders, categorize_bookmarks, load_progress, merge_progress, _estimate_tokens, _input_digest, _pack_batches
+)
+from bookmark_cli.llm_client import LLMClient
+
+class MemoryCache:
+    """Stand-in for CacheStorage's LLM response methods, kept in a dict"""
+    
+    def __init__(self, responses=None):
+        self.responses = dict(responses or {})
+    
+    def get_llm_responses(self, hashes):
+        return {key: self.responses[key] for key in hashes if key in self.responses}
+    
+    def save_llm_responses(self, responses):
+        self.responses.update(responses)
+
+class StubLLMClient:
+    """Puts every bookmark in folder "F" and records the ids it was asked about"""
+    
+    def __init__(self):
+        self.seen = []
+        self.batch_jobs = 0
+    
+    async def categorize_batch(self, batch):
+        self.seen.extend(b["id"] for b in batch)
+        return [{"id": b["id"], "folder": "F", "tags": ["t"], "confidence": 0.9} for b in batch]
+    
+    async def categorize_batches_via_batch_api(self, batches):
+        self.batch_jobs += 1
+        return [await self.categorize_batch(batch) for batch in batches]
+
+def _entries(count):
+    return [{"id": str(i), "url": f"https://example.com/{i}", "title": f"Bookmark {i}"} for i in range(count)]
+
+def test_llm_cache_hits_skip_the_llm(tmp_path):
+    cache = MemoryCache()
+    
+    # First run: everything is a miss, and every result is saved
+    llm_client = StubLLMClient()
+    asyncio.run(categorize_bookmarks(_entries(3), llm_client, batch_size=2, cache=cache))
+    assert sorted(llm_client.seen) == ["0", "1", "2"]
+    assert len(cache.responses) == 3
+    
+    # Second run: only the new bookmark goes to the LLM; hits are checkpointed too
+    llm_client = StubLLMClient()
+    progress_path = tmp_path / "progress.jsonl"
+    categorized = asyncio.run(categorize_bookmarks(
+        _entries(4), llm_client, batch_size=2, cache=cache, progress_path=progress_path
+    ))
+    assert llm_client.seen == ["3"]
+    assert sorted(e["id"] for e in categorized) == ["0", "1", "2", "3"]
+    assert all(e["folder"] == "F" for e in categorized)
+    assert sorted(e["id"] for e in load_progress(progress_path)) == ["0", "1", "2", "3"]
+    assert len(cache.responses) == 4
+
+def test_llm_cache_key_follows_content():
+    cache = MemoryCache()
+    asyncio.run(categorize_bookmarks(_entries(1), StubLLMClient(), cache=cache))
+    
+    # Same id, different title: a miss
+    llm_client = StubLLMClient()
+    changed = [{**_entries(1)[0], "title": "Renamed"}]
+    asyncio.run(categorize_bookmarks(changed, llm_client, cache=cache))
+    assert llm_client.seen == ["0"]
+
+def _write_progress(path, entries, *batches, header=True):
+    lines = [orjson.dumps({"input": _input_digest(entries)})] if header else []
+    lines.extend(orjson.dumps([{**e, "folder": "Saved", "tags": [], "confidence": 0.9} for e in batch]) for batch in batches)
+    path.write_bytes(b"\n".join(lines) + b"\n")
+
+def test_resume_skips_checkpointed_and_keeps_input_order(tmp_path):
+    entries = _entries(4)
+    progress_path = tmp_path / "progress.jsonl"
+    _write_progress(progress_path, entries, [entries[1], entries[3]])
+    
+    llm_client = StubLLMClient()
+    categorized = asyncio.run(categorize_bookmarks(entries, llm_client, batch_size=2, progress_path=progress_path))
+    assert sorted(llm_client.seen) == ["0", "2"]
+    assert [(e["id"], e["folder"]) for e in categorized] == [("0", "F"), ("1", "Saved"), ("2", "F"), ("3", "Saved")]
+    assert sorted(e["id"] for e in load_progress(progress_path)) == ["0", "1", "2", "3"]
+
+def test_resume_ignores_checkpoint_for_other_bookmarks(tmp_path):
+    progress_path = tmp_path / "progress.jsonl"
+    # Same ids, different URLs: a checkpoint from another bookmarks file
+    other = [{**e, "url": e["url"] + "/old"} for e in _entries(2)]
+    _write_progress(progress_path, other, other)
+    assert load_progress(progress_path, _input_digest(_entries(2))) == []
+    
+    llm_client = StubLLMClient()
+    asyncio.run(categorize_bookmarks(_entries(2), llm_client, progress_path=progress_path))
+    assert sorted(llm_client.seen) == ["0", "1"]
+    assert progress_path.read_bytes().startswith(orjson.dumps({"input": _input_digest(_entries(2))}))
+
+def test_load_progress_stops_at_truncated_line(tmp_path):
+    entries = _entries(4)
+    progress_path = tmp_path / "progress.jsonl"
+    _write_progress(progress_path, entries, entries[:2])
+    with open(progress_path, "ab") as f:
+        f.write(orjson.dumps(entries[2:])[:-10])
+    
+    assert [e["id"] for e in load_progress(progress_path, _input_digest(entries))] == ["0", "1"]
+
+def test_load_progress_without_header(tmp_path):
+    entries = _entries(2)
+    progress_path = tmp_path / "progress.jsonl"
+    _write_progress(progress_path, entries, entries, header=False)
+    
+    # Can't tell which bookmarks it was for, so a resume starts fresh
+    assert load_progress(progress_path, _input_digest(entries)) == []
+    assert [e["id"] for e in load_progress(progress_path)] == ["0", "1"]
+
+def test_merge_progress(tmp_path):
+    entries = _entries(4)
+    progress_path = tmp_path / "progress.jsonl"
+    _write_progress(progress_path, entries, [entries[0]], [entries[2]])
+    
+    merged = merge_progress(entries, progress_path)
+    assert [(e["id"], e.get("folder")) for e in merged] == [("0", "Saved"), ("1", None), ("2", "Saved"), ("3", None)]
+    # Nothing merges from a checkpoint for other bookmarks
+    assert merge_progress(_entries(3), progress_path) == _entries(3)
+
+def test_batch_mode_skips_empty_jobs():
+    cache = MemoryCache()
+    llm_client = StubLLMClient()
+    asyncio.run(categorize_bookmarks(_entries(3), llm_client, batch_size=2, cache=cache, batch_mode=True))
+    assert llm_client.batch_jobs == 1
+    
+    # Every bookmark is a cache hit, so no job is submitted
+    llm_client = StubLLMClient()
+    categorized = asyncio.run(categorize_bookmarks(_entries(3), llm_client, cache=cache, batch_mode=True))
+    assert llm_client.batch_jobs == 0
+    assert sorted(e["id"] for e in categorized) == ["0", "1", "2"]
+
+class ScriptedGemini:
+    """Stand-in for GeminiClient that returns the given parsed replies in turn"""
+    
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.calls = 0
+    
+    async def generate_json(self, prompt, system_prompt):
+        self.calls += 1
+        return self.replies.pop(0)
+
+def test_fallback_replies_are_not_cached(tmp_path):
+    cache = MemoryCache()
+    entries = [{"id": "0", "url": "https://github.com/x", "title": "Repo"}]
+    
+    # A malformed reply falls back to a folder guessed from the domain
+    llm_client = LLMClient(api_key="test")
+    llm_client.client = ScriptedGemini({"unexpected": "shape"})
+    progress_path = tmp_path / "progress.jsonl"
+    categorized = asyncio.run(categorize_bookmarks(entries, llm_client, cache=cache, progress_path=progress_path))
+    assert (categorized[0]["folder"], categorized[0]["confidence"]) == ("Github", 0.3)
+    assert cache.responses == {}
+    assert load_progress(progress_path) == []
+    
+    # The next run asks the model again and caches its answer
+    llm_client.client = ScriptedGemini([{"id": "0", "folder": "Code", "tags": ["git"]}])
+    categorized = asyncio.run(categorize_bookmarks(entries, llm_client, cache=cache))
+    assert llm_client.client.calls == 1
+    assert categorized[0]["folder"] == "Code"
+    assert len(cache.responses) == 1
+
+def test_estimate_tokens():
+    entry = {"title": "t" * 40, "meta": "m" * 80, "url": "u" * 40}
+    assert _estimate_tokens(entry) == 40 + 40
+    # meta_description takes precedence over meta; missing fields count as empty
+    assert _estimate_tokens({"meta_description": "d" * 8, "meta": "m" * 80}) == 2 + 40
+    assert _estimate_tokens({"title": None}) == 40
+
+def test_pack_batches_by_count():
+    batches = _pack_batches(_entries(5), batch_size=2)
+    assert [[e["id"] for e in batch] for batch in batches] == [["0", "1"], ["2", "3"], ["4"]]
+
+def test_pack_batches_by_tokens():
+    entries = [{"id": str(i), "title": "t" * size} for i, size in enumerate([400, 400, 40, 40, 2000])]
+    # Estimates: 140, 140, 50, 50, 540 tokens
+    batches = _pack_batches(entries, batch_size=3, max_tokens=300)
+    assert [[e["id"] for e in batch] for batch in batches] == [["0", "1"], ["2", "3"], ["4"]]
+    # batch_size still caps a batch that fits the token budget
+    batches = _pack_batches(entries[2:4] * 2, batch_size=3, max_tokens=10000)
+    assert [len(batch) for batch in batches] == [3, 1]
+
+def _categorized(folder, count, confidence, domain="example.com"):
+    return [
+        {"id": f"{folder}-{domain}-{confidence}-{i}", "url": f"https://{domain}/{i}", "domain": domain,
+         "folder": folder, "tags": [], "confidence": confidence}
+        for i in range(count)
+    ]
+
+def test_build_folders_unsorts_low_confidence_before_splitting():
+    # 10 entries in Dev, but only 4 confident ones: no split needed
+    entries = _categorized("Dev", 4, 0.9) + _categorized("Dev", 6, 0.2)
+    folders = build_folders(entries, max_folder_size=6, min_confidence=0.4)
+    assert [e["folder"] for e in folders] == ["Dev"] * 4 + ["Unsorted"] * 6
+    
+    # Confident entries past the limit are split by domain
+    entries = _categorized("Dev", 4, 0.9, "a.com") + _categorized("Dev", 4, 0.9, "b.com") + _categorized("Dev", 1, 0.1)
+    folders = build_folders(entries, max_folder_size=6, min_confidence=0.4)
+    assert [e["folder"] for e in folders] == ["Dev (1)"] * 4 + ["Dev (2)"] * 4 + ["Unsorted"]
+
+def test_build_folders_without_llm_keeps_assigned_folders():
+    entries = [
+        {"id": "1", "folder": "Kept", "parent": "Bar"},
+        {"id": "2", "parent": "Bar"},
+        {"id": "3"},
+    ]
+    folders = build_folders(entries, use_llm=False)
+    assert [e["folder"] for e in folders] == ["Kept", "Bar", "Unsorted"]
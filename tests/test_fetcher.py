@@ -0,0 +1,43 @@
+# bookmark-cli/tests/test_fetcher.py
+import pytest
+from bookmark_cli.fetcher import MetadataFetcher
+
+def _from_dom(page):
+    fetcher = MetadataFetcher()
+    tree = fetcher._parse_html(page)
+    return {
+        'fetched_title': fetcher._extract_title(tree),
+        'description': fetcher._extract_description(tree),
+        'keywords': fetcher._extract_keywords(tree)
+    }
+
+@pytest.mark.parametrize("head", [
+    # Plain head
+    '<title>Real</title><meta name="description" content="Desc"><meta name="keywords" content="a, b">',
+    # og: tags win over <title> and the description meta
+    '<title>Plain</title><meta property="og:title" content="Real">'
+    '<meta name="description" content="Plain"><meta property="og:description" content="Desc">',
+    # Commented-out meta tags are not tags
+    '<!-- <meta name="description" content="Old"> --><title>Real</title><meta name="description" content="Desc">',
+    # Nor is markup inside a script string
+    '<script>var t = "<title>Fake</title><meta name=\'description\' content=\'Fake\'>";</script>'
+    '<title>Real</title><meta name="description" content="Desc">',
+    '<SCRIPT type="text/javascript">document.write("<title>Fake</title>")</SCRIPT>'
+    '<title>Real</title><meta content="Desc" name="description">',
+])
+def test_scan_head_matches_dom(head):
+    page = f'<html><head>{head}</head><body><p>Body</p></body></html>'
+    assert MetadataFetcher._scan_head(page) == _from_dom(page)
+
+@pytest.mark.parametrize("head", [
+    # The only description is commented out or inside a script
+    '<title>Real</title><!-- <meta name="description" content="Old"> -->',
+    '<title>Real</title><script>s = \'<meta name="description" content="Fake">\'</script>',
+    # An unterminated comment hides the rest of the page
+    '<title>Real</title><!-- <meta name="description" content="Old">',
+    # The only title is inside a script
+    '<script>"<title>Fake</title>"</script><meta name="description" content="Desc">',
+])
+def test_scan_head_defers_to_dom(head):
+    page = f'<html><head>{head}</head><body></body></html>'
+    assert MetadataFetcher._scan_head(page) is None
@@ -0,0 +1,70 @@
+# bookmark-cli/tests/test_gemini_client.py
+import asyncio
+import httpx
+import orjson
+import pytest
+from bookmark_cli.gemini_client import GeminiClient
+from bookmark_cli.llm_client import LLMClient
+
+JOB = "batches/123"
+
+def _inlined(key, payload):
+    text = orjson.dumps(payload).decode()
+    return {
+        "metadata": {"key": key},
+        "response": {"candidates": [{"content": {"parts": [{"text": text}]}}]}
+    }
+
+class BatchAPI:
+    """Fake Batch API: accepts one job, reports it running once, then returns `final`"""
+    
+    def __init__(self, final):
+        self.final = final
+        self.submitted = None
+        self.polls = 0
+    
+    def __call__(self, request):
+        if request.method == "POST":
+            assert request.url.path.endswith(":batchGenerateContent")
+            self.submitted = orjson.loads(request.content)
+            return httpx.Response(200, json={"name": JOB, "metadata": {"state": "BATCH_STATE_PENDING"}})
+        assert request.url.path.endswith(JOB)
+        self.polls += 1
+        if self.polls == 1:
+            return httpx.Response(200, json={"name": JOB, "metadata": {"state": "BATCH_STATE_RUNNING"}})
+        return httpx.Response(200, json={"name": JOB, "done": True, **self.final})
+
+async def _run_batch(api, prompts):
+    client = GeminiClient(api_key="test")
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(api))
+    client._client_loop = asyncio.get_running_loop()
+    async with client:
+        return await client.batch_generate_json(prompts, "system", poll_interval=0)
+
+def test_batch_responses_map_back_by_key():
+    api = BatchAPI({
+        "metadata": {"state": "BATCH_STATE_SUCCEEDED"},
+        "response": {"inlinedResponses": {"inlinedResponses": [
+            # Out of order, and one request failed
+            _inlined("batch_2", [{"id": "c"}]),
+            {"metadata": {"key": "batch_1"}, "error": {"code": 500}},
+            _inlined("batch_0", [{"id": "a"}]),
+        ]}}
+    })
+    results = asyncio.run(_run_batch(api, ["p0", "p1", "p2"]))
+    
+    assert results == [[{"id": "a"}], [], [{"id": "c"}]]
+    assert [r["metadata"]["key"] for r in api.submitted["batch"]["input_config"]["requests"]["requests"]] == [
+        "batch_0", "batch_1", "batch_2"
+    ]
+    assert api.polls == 2
+
+def test_failed_batch_job_raises():
+    api = BatchAPI({"metadata": {"state": "BATCH_STATE_FAILED"}, "error": {"message": "quota"}})
+    with pytest.raises(RuntimeError, match="BATCH_STATE_FAILED"):
+        asyncio.run(_run_batch(api, ["p0"]))
+
+def test_batch_mode_is_gemini_only():
+    client = LLMClient(api_key="test", provider="openai")
+    with pytest.raises(ValueError):
+        asyncio.run(client.categorize_batches_via_batch_api([[{"id": "1"}]]))
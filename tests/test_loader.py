@@ -1,8 +1,7 @@
 # bookmark-cli/tests/test_loader.py
+import io
 import json
-import tempfile
-from pathlib import Path
-from bookmark_cli.loader import load_chrome_bookmarks, flatten_bookmarks
+from bookmark_cli.loader import load_chrome_bookmarks, load_chrome_bookmarks_html_bytes, flatten_bookmarks
 
 def test_load_chrome_bookmarks():
     # Create a mock Chrome bookmarks file
@@ -30,16 +29,9 @@ def test_load_chrome_bookmarks():
         "version": 1
     }
     
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
-        json.dump(mock_bookmarks, f)
-        temp_path = Path(f.name)
-    
-    try:
-        loaded = load_chrome_bookmarks(temp_path)
-        assert loaded["version"] == 1
-        assert "roots" in loaded
-    finally:
-        temp_path.unlink()
+    loaded = load_chrome_bookmarks(io.StringIO(json.dumps(mock_bookmarks)))
+    assert loaded["version"] == 1
+    assert "roots" in loaded
 
 def test_flatten_bookmarks():
     mock_bookmarks = {
@@ -70,4 +62,53 @@ def test_flatten_bookmarks():
     assert len(flattened) == 1
     assert flattened[0]["url"] == "https://example.com"
     assert flattened[0]["parent"] == "Test Folder"
-    assert flattened[0]["original_parent_id"] == "1"
\ No newline at end of file
+    assert flattened[0]["original_parent_id"] == "1"
+
+def test_load_chrome_bookmarks_html_bytes():
+    html = b"""<!DOCTYPE NETSCAPE-Bookmark-file-1>
+<DL><p>
+    <DT><H3 ADD_DATE="1">Dev</H3>
+    <DL><p>
+        <DT><A HREF="https://example.com" ADD_DATE="1234567890">Example</A>
+    </DL><p>
+</DL><p>"""
+    
+    bookmarks = load_chrome_bookmarks_html_bytes(html)
+    
+    assert len(bookmarks) == 1
+    assert bookmarks[0]["url"] == "https://example.com"
+    assert bookmarks[0]["title"] == "Example"
+    assert bookmarks[0]["date_added"] == "1234567890"
+    assert bookmarks[0]["parent"] == "Dev"
+
+def test_load_chrome_bookmarks_html_nested_folders():
+    html = b"""<!DOCTYPE NETSCAPE-Bookmark-file-1>
+<DL><p>
+    <DT><H3>Bookmarks bar</H3>
+    <DL><p>
+        <DT><A HREF="https://a.example">A</A>
+        <DT><H3>Dev</H3>
+        <DL><p>
+            <DT><A HREF="https://b.example">B</A>
+            <DT><H3>Python</H3>
+            <DL><p>
+                <DT><A HREF="https://c.example">C</A>
+            </DL><p>
+            <DT><A HREF="https://d.example">D</A>
+        </DL><p>
+        <DT><A HREF="https://e.example">E</A>
+    </DL><p>
+    <DT><A HREF="https://f.example">F</A>
+</DL><p>"""
+    
+    bookmarks = load_chrome_bookmarks_html_bytes(html)
+    
+    # Each closed subfolder hands its following bookmarks back to the parent
+    assert [(b["title"], b["parent"]) for b in bookmarks] == [
+        ("A", "Bookmarks bar"),
+        ("B", "Dev"),
+        ("C", "Python"),
+        ("D", "Dev"),
+        ("E", "Bookmarks bar"),
+        ("F", "Root"),
+    ]
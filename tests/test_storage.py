@@ -0,0 +1,37 @@
+# bookmark-cli/tests/test_storage.py
+from bookmark_cli.storage import CacheStorage
+
+def test_metadata_bulk_roundtrip(tmp_path):
+    # More URLs than fit in one IN (...) statement
+    urls = [f"https://example.com/{i}" for i in range(2000)]
+    with CacheStorage(tmp_path / "cache") as cache:
+        cache.save_metadata_bulk(
+            (url, {"title": f"T{i}", "status_code": 200, "domain": "example.com", "fetch_success": True})
+            for i, url in enumerate(urls)
+        )
+        found = cache.get_metadata_many(urls + ["https://missing.example/"])
+        
+        assert len(found) == 2000
+        assert found[urls[1500]]["title"] == "T1500"
+        assert found[urls[0]]["fetch_success"] is True
+        assert found[urls[0]]["description"] is None
+        assert cache.get_metadata(urls[42]) == found[urls[42]]
+        assert cache.get_metadata_many([]) == {}
+        
+        # Saving again replaces the row
+        cache.save_metadata_bulk([(urls[0], {"title": "New"})])
+        assert cache.get_metadata(urls[0])["title"] == "New"
+        assert cache.get_metadata(urls[0])["fetch_success"] is False
+
+def test_llm_responses_roundtrip(tmp_path):
+    responses = {f"h{i}": {"folder": f"F{i % 7}", "tags": ["a", "b"]} for i in range(1000)}
+    with CacheStorage(tmp_path / "cache") as cache:
+        cache.save_llm_responses(responses)
+        found = cache.get_llm_responses(list(responses) + ["missing"])
+        
+        assert found == responses
+        assert cache.get_llm_responses(["missing"]) == {}
+
+    # Persisted across connections
+    with CacheStorage(tmp_path / "cache") as cache:
+        assert cache.get_llm_responses(["h999"]) == {"h999": responses["h999"]}